@@ -0,0 +1,77 @@
+"""
+Denormalised order counters on :class:`~accounts.models.Customer`.
+
+``order_count`` counts every order a customer has placed and
+``lifetime_value`` sums the totals of those that were not cancelled. Both
+are moved with ``UPDATE ... SET order_count = order_count + n`` statements in
+the transaction that writes the order (see ``accounts.signals``), so
+concurrent orders for the same customer cannot lose an increment, and lists
+can sort and filter on them without aggregating over orders.
+
+Writes that send no signals (``bulk_create``, queryset ``update()``, raw
+SQL) bypass the counters; :func:`recount_customers` recomputes them in bulk.
+"""
+
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from orders.models import Order
+
+from .models import Customer
+
+
+CANCELLED = 'cancelled'
+
+ZERO = Decimal('0.00')
+
+
+def order_value(total_amount, status):
+    """What an order adds to its customer's lifetime value."""
+    if status == CANCELLED or total_amount is None:
+        return ZERO
+    return Decimal(str(total_amount))
+
+
+def adjust_customer(customer_id, orders=0, value=ZERO):
+    """Add ``orders`` and ``value`` (either may be negative) to a customer's counters."""
+    if customer_id is None or (not orders and not value):
+        return
+    Customer.objects.filter(pk=customer_id).update(
+        order_count=F('order_count') + orders,
+        lifetime_value=F('lifetime_value') + value,
+    )
+
+
+def _actual_counts():
+    orders = Order.objects.filter(customer=OuterRef('pk')).order_by().values('customer')
+    order_count = orders.annotate(count=Count('pk')).values('count')
+    lifetime_value = orders.annotate(
+        value=Sum('total_amount', filter=~Q(status=CANCELLED))
+    ).values('value')
+    money = DecimalField(max_digits=12, decimal_places=2)
+    return {
+        'order_count': Coalesce(Subquery(order_count), 0),
+        'lifetime_value': Coalesce(
+            Subquery(lifetime_value, output_field=money), Value(ZERO), output_field=money
+        ),
+    }
+
+
+def recount_customers(ids=None):
+    """
+    Recompute the counters of the customers in ``ids`` (all when ``None``)
+    from their orders. Returns the number of customers that had drifted.
+    """
+    actual = _actual_counts()
+    customers = Customer.objects.all() if ids is None else Customer.objects.filter(pk__in=ids)
+    drifted = customers.alias(
+        actual_order_count=actual['order_count'], actual_lifetime_value=actual['lifetime_value']
+    ).filter(
+        ~Q(order_count=F('actual_order_count')) | ~Q(lifetime_value=F('actual_lifetime_value'))
+    )
+    drifted_ids = list(drifted.values_list('pk', flat=True))
+    if drifted_ids:
+        Customer.objects.filter(pk__in=drifted_ids).update(**actual)
+    return len(drifted_ids)
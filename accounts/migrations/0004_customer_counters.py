@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-18 17:54
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Customer = apps.get_model('accounts', 'Customer')
+    Order = apps.get_model('orders', 'Order')
+    orders = Order.objects.filter(customer=OuterRef('pk')).order_by().values('customer')
+    money = DecimalField(max_digits=12, decimal_places=2)
+    Customer.objects.update(
+        order_count=Coalesce(Subquery(orders.annotate(count=Count('pk')).values('count')), 0),
+        lifetime_value=Coalesce(
+            Subquery(
+                orders.annotate(value=Sum('total_amount', filter=~Q(status='cancelled'))).values('value'),
+                output_field=money,
+            ),
+            Value(Decimal('0.00')),
+            output_field=money,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_query_indexes'),
+        ('orders', '0003_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='lifetime_value',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='order_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -19,11 +19,19 @@ class Customer(models.Model):
     address = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
     date_joined = models.DateTimeField(default=timezone.now)
+    # Denormalised from the customer's orders (see accounts.counters); kept
+    # current by the order signals, repaired by ``manage.py recount``.
+    order_count = models.PositiveIntegerField(default=0, editable=False)
+    lifetime_value = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
 
     objects = models.Manager()
 
     class Meta:
         ordering = ['-date_joined']
+        indexes = [
+            # Default ordering and the customer list's keyset pages.
+            models.Index(fields=['-date_joined', '-id'], name='customer_date_joined_idx'),
+        ]
 
     def __str__(self):
         return self.username
@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from orders.models import Order
+
+from .counters import adjust_customer, order_value, recount_customers
+
+
+def _counted(order):
+    return order.customer_id, order_value(order.total_amount, order.status)
+
+
+@receiver(post_save, sender=Order)
+def update_customer_counters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    customer_id, value = _counted(instance)
+    loaded = getattr(instance, '_loaded_values', None)
+    if created:
+        adjust_customer(customer_id, 1, value)
+    elif loaded is None:
+        # An existing row saved from an unloaded instance: the previous
+        # values are unknown, so recount the customer instead.
+        recount_customers([customer_id])
+    else:
+        previous_id = loaded.get('customer_id', customer_id)
+        previous_value = order_value(
+            loaded.get('total_amount', instance.total_amount), loaded.get('status', instance.status)
+        )
+        if previous_id == customer_id:
+            adjust_customer(customer_id, 0, value - previous_value)
+        else:
+            adjust_customer(previous_id, -1, -previous_value)
+            adjust_customer(customer_id, 1, value)
+    instance._loaded_values = {
+        'customer_id': customer_id, 'total_amount': instance.total_amount, 'status': instance.status,
+    }
+
+
+@receiver(post_delete, sender=Order)
+def remove_from_customer_counters(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    adjust_customer(
+        loaded.get('customer_id', instance.customer_id),
+        -1,
+        -order_value(loaded.get('total_amount', instance.total_amount), loaded.get('status', instance.status)),
+    )
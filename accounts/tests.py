@@ -1,6 +1,14 @@
+from decimal import Decimal
+from unittest import mock
+
 from django.test import TestCase
 from django.urls import reverse
 
+from orders.models import Order
+from orders.stock import create_order, set_status
+from products.models import Category, Product
+
+from .counters import recount_customers
 from .models import Customer, User
 
 
@@ -66,3 +74,86 @@ class UserViewsTests(TestCase):
         })
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'Access is restricted to staff members')
+
+
+class CustomerListQueryCountTest(TestCase):
+
+    def test_list_query_count_is_fixed_for_1000_customers(self):
+        staff = User.objects.create_user(username='staff', password='staffpass', is_staff=True)
+        self.client.force_login(staff)
+        customers = Customer.objects.bulk_create(
+            Customer(username=f'bulk{i}', email=f'bulk{i}@example.com', password='x') for i in range(1000)
+        )
+        Order.objects.bulk_create(Order(customer=customer, total_amount=1) for customer in customers)
+        recount_customers()
+
+        # session, user, customers page with their stored order counts
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('customer_list'), {'page_size': 200})
+        self.assertEqual(response.context['page'].object_list[0].order_count, 1)
+
+
+class CustomerCountersTest(TestCase):
+
+    def setUp(self):
+        self.customer = Customer.objects.create(username='ann', email='ann@example.com', password='x')
+        category = Category.objects.create(name='Tools')
+        self.product = Product.objects.create(name='Hammer', price=Decimal('12.50'), stock_quantity=10, category=category)
+
+    def _order(self, quantity=2, customer=None):
+        return create_order(Order(customer=customer or self.customer, total_amount=0), [(self.product.pk, quantity)])
+
+    def _counters(self, customer=None):
+        customer = Customer.objects.get(pk=(customer or self.customer).pk)
+        return customer.order_count, customer.lifetime_value
+
+    def test_orders_are_counted_as_they_are_written(self):
+        order = self._order()
+        self._order(quantity=1)
+        self.assertEqual(self._counters(), (2, Decimal('37.50')))
+
+        set_status(Order.objects.get(pk=order.pk), 'cancelled')
+        self.assertEqual(self._counters(), (2, Decimal('12.50')))
+        set_status(Order.objects.get(pk=order.pk), 'cancelled')
+        self.assertEqual(self._counters(), (2, Decimal('12.50')))
+        set_status(Order.objects.get(pk=order.pk), 'pending')
+        self.assertEqual(self._counters(), (2, Decimal('37.50')))
+
+        Order.objects.get(pk=order.pk).delete()
+        self.assertEqual(self._counters(), (1, Decimal('12.50')))
+
+    def test_moving_an_order_moves_its_counts(self):
+        other = Customer.objects.create(username='bob', email='bob@example.com', password='x')
+        order = Order.objects.get(pk=self._order().pk)
+        order.customer = other
+        order.save()
+        self.assertEqual(self._counters(), (0, Decimal('0.00')))
+        self.assertEqual(self._counters(other), (1, Decimal('25.00')))
+
+    def test_counters_roll_back_with_the_row(self):
+        order = Order.objects.get(pk=self._order().pk)
+        order.total_amount = Decimal('99.00')
+        with mock.patch('accounts.signals.adjust_customer', side_effect=[None, RuntimeError]):
+            with self.assertRaises(RuntimeError):
+                order.customer = Customer.objects.create(username='bob', email='bob@example.com', password='x')
+                order.save()
+        order.refresh_from_db()
+        self.assertEqual((order.customer_id, order.total_amount), (self.customer.pk, Decimal('25.00')))
+        self.assertEqual(self._counters(), (1, Decimal('25.00')))
+
+    def test_recount_repairs_drift(self):
+        self._order()
+        Customer.objects.update(order_count=7, lifetime_value=0)
+        self.assertEqual(recount_customers(), 1)
+        self.assertEqual(self._counters(), (1, Decimal('25.00')))
+        self.assertEqual(recount_customers(), 0)
+
+    def test_customer_with_orders_cannot_be_deleted(self):
+        staff = User.objects.create_user(username='staff', password='staffpass', is_staff=True)
+        self.client.force_login(staff)
+        self._order()
+        Customer.objects.update(order_count=0)
+        response = self.client.post(reverse('customer_delete', args=[self.customer.pk]), follow=True)
+        self.assertRedirects(response, reverse('customer_list'))
+        self.assertContains(response, 'This customer has 1 order(s) and cannot be deleted.')
+        self.assertTrue(Customer.objects.filter(pk=self.customer.pk).exists())
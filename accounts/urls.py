@@ -8,6 +8,7 @@ urlpatterns = [
 
     # Customer Management URLs
     path('customers/', views.customer_list, name='customer_list'),
+    path('customers/export/', views.customer_export, name='customer_export'),
     path('customers/create/', views.customer_create, name='customer_create'),
     path('customers/<int:customer_id>/edit/', views.customer_edit, name='customer_edit'),
     path('customers/<int:customer_id>/delete/', views.customer_delete, name='customer_delete'),
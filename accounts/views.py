@@ -2,8 +2,11 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login
 from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import redirect, render, get_object_or_404
-from django.db.models import Q
 from .models import Customer, User
+from ecommerce.exports import export_response
+from ecommerce.pagination import paginate
+from ecommerce.routers import use_replica
+from search.backends import filter_ranked, get_result_limit, matching, ranked_search
 
 def login_view(request):
     if request.method == 'POST':
@@ -19,29 +22,65 @@ def login_view(request):
             messages.error(request, 'Invalid username or password. Please try again.')
     return render(request, 'accounts/login.html')
 
+# (header, lookup) pairs for the CSV / NDJSON export.
+CUSTOMER_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('username', 'username'),
+    ('email', 'email'),
+    ('first_name', 'first_name'),
+    ('last_name', 'last_name'),
+    ('phone_number', 'phone_number'),
+    ('is_active', 'is_active'),
+    ('date_joined', 'date_joined'),
+    ('order_count', 'order_count'),
+    ('lifetime_value', 'lifetime_value'),
+]
+
+
+def filter_customers(customers, params):
+    """Apply the ``search`` filter of the customer export: every matching customer, unranked."""
+    search_query = params.get('search')
+    if search_query:
+        customers = customers.filter(pk__in=matching('customer', search_query))
+    return customers
+
+
+def customer_export_queryset(params):
+    return filter_customers(Customer.objects.all(), params).order_by('id')
+
+
 # Customer Management Views
 @staff_member_required
+@use_replica
 def customer_list(request):
     """Admin view for managing all customers"""
-    customers = Customer.objects.all().order_by('-date_joined')
+    customers = Customer.objects.order_by('-date_joined')
+    ordering = ('-date_joined', '-id')
 
-    # Search functionality
+    # Search functionality: the best ranked full-text matches, best first
     search_query = request.GET.get('search')
+    search_truncated = False
     if search_query:
-        customers = customers.filter(
-            Q(username__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(phone_number__icontains=search_query)
-        )
+        ids, search_truncated = ranked_search('customer', search_query)
+        customers, ordering = filter_ranked(customers, ids)
+
+    page = paginate(request, customers, ordering)
 
     context = {
-        'customers': customers,
+        'customers': page,
+        'page': page,
         'search_query': search_query,
+        'search_truncated': search_truncated,
+        'search_limit': get_result_limit(),
     }
     return render(request, 'accounts/customer_list.html', context)
 
+
+@staff_member_required
+def customer_export(request):
+    """Stream every customer matching the list search as CSV or NDJSON"""
+    return export_response(request, 'customers', customer_export_queryset(request.GET), CUSTOMER_EXPORT_COLUMNS)
+
 @staff_member_required
 def customer_create(request):
     """Admin view for creating a new customer"""
@@ -121,9 +160,11 @@ def customer_delete(request, customer_id):
     """Admin view for deleting a customer"""
     customer = get_object_or_404(Customer, id=customer_id)
 
-    # Check if customer can be deleted
-    if customer.orders.count() > 0:
-        messages.error(request, f'This customer has {customer.orders.count()} order(s) and cannot be deleted.')
+    # Check if customer can be deleted. The stored count answers without a
+    # query; a zero is confirmed against the orders since deleting cascades.
+    order_count = customer.order_count or customer.orders.count()
+    if order_count:
+        messages.error(request, f'This customer has {order_count} order(s) and cannot be deleted.')
         return redirect('customer_list')
 
     if request.method == 'POST':
@@ -0,0 +1,19 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+from ecommerce.pagination import DEFAULT_MAX_PAGE_SIZE, DEFAULT_PAGE_SIZE
+
+
+class ApiCursorPagination(CursorPagination):
+    """
+    Cursor pagination on the primary key: each page is one indexed range scan
+    and no COUNT(*) is run, however deep an integration pages.
+    """
+
+    ordering = '-pk'
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        # Same limits as the HTML list views (ecommerce/pagination.py).
+        self.page_size = getattr(settings, 'PAGINATION_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+        self.max_page_size = getattr(settings, 'PAGINATION_MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)
@@ -0,0 +1,83 @@
+from rest_framework import serializers
+
+from accounts.models import Customer
+from orders.models import Order, OrderItem
+from payments.models import Payment
+from products.models import Category, Product
+
+
+def requested_fields(request):
+    """Return the set of names in ``?fields=a,b``, or ``None`` for all fields."""
+    if request is None:
+        return None
+    value = request.query_params.get('fields')
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """Drop every top-level field not named in the request's ``?fields=``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get('request'))
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ['category_id', 'name', 'description', 'product_count', 'total_stock']
+
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.name', read_only=True)
+
+    class Meta:
+        model = Product
+        fields = [
+            'product_id', 'sku', 'name', 'description', 'price', 'stock_quantity',
+            'category', 'category_name', 'image_url', 'created_at',
+        ]
+
+
+class CustomerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Customer
+        fields = [
+            'id', 'username', 'email', 'first_name', 'last_name',
+            'phone_number', 'address', 'is_active', 'date_joined',
+            'order_count', 'lifetime_value',
+        ]
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source='product.name', read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ['order_item_id', 'product', 'product_name', 'quantity', 'price']
+
+
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    customer_username = serializers.CharField(source='customer.username', read_only=True)
+    items = OrderItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'order_id', 'customer', 'customer_username', 'status',
+            'total_amount', 'created_at', 'items',
+        ]
+
+
+class PaymentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Payment
+        fields = [
+            'payment_id', 'order', 'payment_method', 'amount', 'transaction_id',
+            'status', 'notes', 'created_at', 'updated_at',
+        ]
@@ -0,0 +1,80 @@
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import Customer, User
+from orders.models import Order, OrderItem
+from payments.models import Payment
+from products.models import Category, Product
+
+
+class ApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', password='x', is_staff=True)
+        cls.category = Category.objects.create(name='Garden')
+        cls.products = [
+            Product.objects.create(
+                name=f'Rake {i}', price=Decimal('12.50'), stock_quantity=i, category=cls.category
+            )
+            for i in range(5)
+        ]
+        customer = Customer.objects.create(username='gardener', email='g@example.com', password='x')
+        for i in range(10):
+            order = Order.objects.create(customer=customer, total_amount=Decimal('25.00'))
+            OrderItem.objects.create(order=order, product=cls.products[i % 5], quantity=2, price=Decimal('12.50'))
+            Payment.objects.create(order=order, payment_method='paypal', amount=Decimal('25.00'))
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_requires_staff(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api-product-list')).status_code, 403)
+
+    def test_cursor_pages_cover_every_row_once(self):
+        url = reverse('api-product-list') + '?page_size=2'
+        ids = []
+        while url:
+            data = self.client.get(url).json()
+            ids += [product['product_id'] for product in data['results']]
+            url = data['next']
+        self.assertEqual(ids, sorted((product.pk for product in self.products), reverse=True))
+
+    def test_orders_nest_items_in_fixed_queries(self):
+        # session, user, orders with customers, items with products
+        with self.assertNumQueries(4):
+            data = self.client.get(reverse('api-order-list')).json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertEqual(data['results'][0]['items'][0]['product_name'], 'Rake 4')
+
+    def test_sparse_fields_skip_unneeded_joins(self):
+        with self.assertNumQueries(3):
+            data = self.client.get(reverse('api-order-list'), {'fields': 'order_id,status'}).json()
+        self.assertEqual(set(data['results'][0]), {'order_id', 'status'})
+
+        detail = self.client.get(
+            reverse('api-category-detail', args=[self.category.pk]), {'fields': 'name,product_count'}
+        ).json()
+        self.assertEqual(detail, {'name': 'Garden', 'product_count': 5})
+
+    def test_etag_returns_not_modified_until_data_changes(self):
+        url = reverse('api-payment-list')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        Payment.objects.update(status='completed')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @override_settings(PAGINATION_MAX_PAGE_SIZE=3)
+    def test_page_size_capped(self):
+        data = self.client.get(reverse('api-customer-list'), {'page_size': 50}).json()
+        self.assertEqual(len(data['results']), 1)
+        data = self.client.get(reverse('api-payment-list'), {'page_size': 50}).json()
+        self.assertEqual(len(data['results']), 3)
@@ -0,0 +1,14 @@
+from rest_framework.routers import DefaultRouter
+
+from . import views
+
+router = DefaultRouter()
+# JSON is the only format served, so there is nothing for ``.json`` to pick.
+router.include_format_suffixes = False
+router.register('categories', views.CategoryViewSet, basename='api-category')
+router.register('products', views.ProductViewSet, basename='api-product')
+router.register('customers', views.CustomerViewSet, basename='api-customer')
+router.register('orders', views.OrderViewSet, basename='api-order')
+router.register('payments', views.PaymentViewSet, basename='api-payment')
+
+urlpatterns = router.urls
@@ -0,0 +1,85 @@
+"""
+Read-only JSON API under ``/api/v1/``.
+
+Every endpoint pages with a primary-key cursor, accepts ``?fields=`` to
+return only some top-level fields (related rows are then only loaded when a
+field needs them) and answers ``If-None-Match`` with ``304 Not Modified``
+when the page has not changed since the client's copy.
+"""
+
+import hashlib
+
+from django.db.models import Prefetch
+from django.utils.cache import get_conditional_response, quote_etag
+from rest_framework import viewsets
+
+from accounts.models import Customer
+from orders.models import Order, OrderItem
+from payments.models import Payment
+from products.models import Category, Product
+
+from .serializers import (
+    CategorySerializer, CustomerSerializer, OrderSerializer, PaymentSerializer,
+    ProductSerializer, requested_fields,
+)
+
+
+class ApiViewSet(viewsets.ReadOnlyModelViewSet):
+
+    def wants(self, field):
+        """Whether the response includes ``field`` (see ``?fields=``)."""
+        fields = requested_fields(self.request)
+        return fields is None or field in fields
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method in ('GET', 'HEAD') and response.status_code == 200:
+            # The ETag is a hash of the body, so the page is still queried,
+            # but an unchanged page costs the client no transfer.
+            response.render()
+            etag = quote_etag(hashlib.md5(response.content, usedforsecurity=False).hexdigest())
+            response['ETag'] = etag
+            return get_conditional_response(request._request, etag=etag, response=response)
+        return response
+
+
+class CategoryViewSet(ApiViewSet):
+    serializer_class = CategorySerializer
+
+    def get_queryset(self):
+        # product_count and total_stock are stored on the category.
+        return Category.objects.all()
+
+
+class ProductViewSet(ApiViewSet):
+    serializer_class = ProductSerializer
+
+    def get_queryset(self):
+        products = Product.objects.all()
+        if self.wants('category_name'):
+            products = products.select_related('category')
+        return products
+
+
+class CustomerViewSet(ApiViewSet):
+    serializer_class = CustomerSerializer
+    queryset = Customer.objects.all()
+
+
+class OrderViewSet(ApiViewSet):
+    serializer_class = OrderSerializer
+
+    def get_queryset(self):
+        orders = Order.objects.all()
+        if self.wants('customer_username'):
+            orders = orders.select_related('customer')
+        if self.wants('items'):
+            orders = orders.prefetch_related(
+                Prefetch('items', queryset=OrderItem.objects.select_related('product').order_by('pk'))
+            )
+        return orders
+
+
+class PaymentViewSet(ApiViewSet):
+    serializer_class = PaymentSerializer
+    queryset = Payment.objects.all()
@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'dashboard'
\ No newline at end of file
+    name = 'dashboard'
+
+    def ready(self):
+        from ecommerce.sqlite import configure_connection
+
+        from . import signals  # noqa: F401
+
+        # SQLite pragmas (SQLITE_TUNING); the project package is not an app.
+        connection_created.connect(configure_connection, dispatch_uid='ecommerce.sqlite')
@@ -0,0 +1,407 @@
+"""
+Per-view performance measurement for the staff pages.
+
+``seed`` fills the database with a given number of customers, products,
+orders and payments; ``measure_all`` then requests every GET page routed from
+``ecommerce/urls.py`` as a staff user and records the query count, time spent
+in SQL, template render time, wall time and peak Python memory of each.
+``check_budget`` compares a run against the budget checked in next to this
+module (``perf_budget.json``), and ``check_query_growth`` compares two runs
+taken at different data volumes. ``benchmark_templates`` times rendering the
+heaviest page templates with and without the cached template loader.
+
+Used by both the ``benchmark_views`` management command and the regression
+tests in ``dashboard/tests.py``.
+"""
+
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template as DjangoBackendTemplate
+from django.test import Client, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.urls.resolvers import RegexPattern
+from django.utils import timezone
+
+from accounts.counters import recount_customers
+from ecommerce.templating import warm_templates
+from accounts.models import Customer, User
+from orders.models import Order, OrderItem
+from payments.models import Payment
+from products.counters import recount_categories
+from products.models import Category, Product
+
+from .inventory import refresh_snapshot
+from .rollups import rebuild_all
+
+
+BUDGET_PATH = Path(__file__).resolve().parent / 'perf_budget.json'
+
+# URL prefixes that are not staff pages of this project (Django's own admin
+# site, uploaded media) or that change state on GET.
+EXCLUDED_PREFIXES = ('admin/', 'media/')
+EXCLUDED_NAMES = {'logout', 'home'}
+
+# Pages whose template render time ``benchmark_templates`` compares.
+TEMPLATE_PAGES = ('admin_orders', 'dashboard:dashboard')
+TEMPLATE_MODES = ('uncached', 'cached_cold', 'cached_warm')
+
+STATUSES = ['pending', 'processing', 'shipped', 'delivered', 'cancelled']
+PAYMENT_STATUSES = ['pending', 'completed', 'failed', 'refunded']
+PAYMENT_METHODS = ['credit_card', 'paypal', 'bank_transfer']
+
+
+def seed(n, seed_value=0, items_per_order=3, categories=8):
+    """
+    Insert ``n`` customers, products, orders and payments (plus
+    ``items_per_order`` items per order) with ``bulk_create``. Can be called
+    repeatedly to grow the data set; every call adds ``n`` more of each.
+    """
+    rng = random.Random(seed_value)
+    offset = Customer.objects.count()
+    now = timezone.now()
+
+    category_objects = list(Category.objects.all()[:categories])
+    if not category_objects:
+        category_objects = Category.objects.bulk_create(
+            Category(name=f'Benchmark Category {i}', description='Benchmark data')
+            for i in range(categories)
+        )
+
+    customers = Customer.objects.bulk_create(
+        Customer(
+            username=f'bench_{offset + i}',
+            email=f'bench_{offset + i}@example.com',
+            password='!',
+            first_name='Bench',
+            last_name=str(offset + i),
+        )
+        for i in range(n)
+    )
+    products = Product.objects.bulk_create(
+        Product(
+            name=f'Benchmark Product {offset + i}',
+            description='Benchmark data',
+            price=Decimal(rng.randint(100, 50000)) / 100,
+            stock_quantity=rng.randint(0, 200),
+            category=category_objects[i % len(category_objects)],
+        )
+        for i in range(n)
+    )
+    orders = Order.objects.bulk_create(
+        Order(
+            customer=customers[rng.randrange(n)],
+            total_amount=Decimal('0.00'),
+            status=rng.choice(STATUSES),
+        )
+        for _ in range(n)
+    )
+
+    items = []
+    for order in orders:
+        total = Decimal('0.00')
+        for product in rng.sample(products, min(items_per_order, len(products))):
+            quantity = rng.randint(1, 3)
+            items.append(OrderItem(order=order, product=product, quantity=quantity, price=product.price))
+            total += product.price * quantity
+        order.total_amount = total
+        order.created_at = now - timedelta(days=rng.randint(0, 365), seconds=rng.randint(0, 86399))
+    OrderItem.objects.bulk_create(items, batch_size=1000)
+    Order.objects.bulk_update(orders, ['total_amount', 'created_at'], batch_size=1000)
+
+    Payment.objects.bulk_create(
+        Payment(
+            order=order,
+            payment_method=rng.choice(PAYMENT_METHODS),
+            amount=order.total_amount,
+            transaction_id=f'BENCH-{order.order_id}',
+            status=rng.choice(PAYMENT_STATUSES),
+        )
+        for order in orders
+    )
+
+    # bulk_create skips the model signals that keep the rollup and the
+    # denormalised counters current.
+    rebuild_all()
+    recount_customers()
+    recount_categories()
+    refresh_snapshot()
+
+
+def get_staff_user():
+    user, created = User.objects.get_or_create(
+        username='benchmark_staff',
+        defaults={'is_staff': True, 'is_superuser': True},
+    )
+    if created:
+        user.set_unusable_password()
+        user.save()
+    return user
+
+
+def _route(pattern):
+    route = str(pattern.pattern)
+    if isinstance(pattern.pattern, RegexPattern):
+        # re_path() routes, e.g. from DRF routers: '^products/$' -> 'products/'
+        route = route.lstrip('^').rstrip('$')
+    return route
+
+
+def _iter_patterns(patterns, prefix=''):
+    for pattern in patterns:
+        route = prefix + _route(pattern)
+        if isinstance(pattern, URLResolver):
+            yield from _iter_patterns(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern):
+            yield route, pattern
+
+
+def _sample_kwargs():
+    """Primary keys to substitute for the ``<int:...>`` parts of routes."""
+    samples = {
+        'product_id': Product.objects.values_list('pk', flat=True).first(),
+        'category_id': Category.objects.values_list('pk', flat=True).first(),
+        'order_id': Order.objects.values_list('pk', flat=True).first(),
+        'payment_id': Payment.objects.values_list('pk', flat=True).first(),
+        'customer_id': Customer.objects.values_list('pk', flat=True).first(),
+    }
+    return {key: value for key, value in samples.items() if value is not None}
+
+
+def staff_urls():
+    """Return ``[(name, path), ...]`` for every GET page under ``ecommerce/urls.py``."""
+    samples = _sample_kwargs()
+    urls = []
+    for route, pattern in _iter_patterns(get_resolver().url_patterns):
+        if route.startswith(EXCLUDED_PREFIXES) or pattern.name in EXCLUDED_NAMES:
+            continue
+        if isinstance(pattern.pattern, RegexPattern) and pattern.pattern.regex.groups:
+            # Regex captures cannot be filled in from the sample keys.
+            continue
+        converters = pattern.pattern.converters
+        if any(key not in samples for key in converters):
+            continue
+        path = route
+        for key in converters:
+            path = path.replace(f'<int:{key}>', str(samples[key]))
+        urls.append((pattern.name or route, '/' + path))
+    return urls
+
+
+@contextmanager
+def _instrument():
+    stats = {'queries': 0, 'sql_ms': 0.0, 'render_ms': 0.0}
+
+    def execute_wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            stats['queries'] += 1
+            stats['sql_ms'] += (time.perf_counter() - started) * 1000
+
+    original_render = DjangoBackendTemplate.render
+
+    def timed_render(template, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return original_render(template, context, request)
+        finally:
+            stats['render_ms'] += (time.perf_counter() - started) * 1000
+
+    with ExitStack() as stack:
+        # Every alias, so pages reading from a replica are counted too.
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(execute_wrapper))
+        stack.enter_context(mock.patch.object(DjangoBackendTemplate, 'render', timed_render))
+        # Keep the async views' blocks on this thread: worker threads would
+        # neither be counted nor see data seeded in an open transaction.
+        stack.enter_context(override_settings(ASYNC_CONCURRENT_QUERIES=False))
+        yield stats
+
+
+def _get(client, path):
+    response = client.get(path)
+    if response.streaming:
+        # Streamed bodies are produced lazily; drain them so their queries
+        # and memory are counted against this page.
+        b''.join(response.streaming_content)
+    return response
+
+
+def _clear_caches():
+    for cache in caches.all():
+        cache.clear()
+
+
+def measure(client, path):
+    """
+    Return the metrics for ``path``. Timings and query counts come from one
+    request; peak memory from a second one, since tracemalloc slows
+    allocation-heavy code down enough to distort the timings. Caches are
+    cleared before each, so the budget covers a cold cache.
+    """
+    _clear_caches()
+    started = time.perf_counter()
+    with _instrument() as stats:
+        response = _get(client, path)
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    _clear_caches()
+    tracemalloc.start()
+    try:
+        _get(client, path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'path': path,
+        'status': response.status_code,
+        'queries': stats['queries'],
+        'sql_ms': round(stats['sql_ms'], 2),
+        'render_ms': round(stats['render_ms'], 2),
+        'wall_ms': round(wall_ms, 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def measure_all(client=None):
+    """Measure every staff page; returns ``{url_name: metrics}``."""
+    if client is None:
+        client = Client()
+        client.force_login(get_staff_user())
+    # Warm up once so one-off costs (template compilation, URL resolver
+    # population, session lookups) are not attributed to the first page.
+    urls = staff_urls()
+    for _, path in urls:
+        client.get(path)
+    return {name: measure(client, path) for name, path in urls}
+
+
+def load_budget(path=BUDGET_PATH):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def check_budget(results, budget=None):
+    """Return a list of human readable budget violations for ``results``."""
+    budget = budget or load_budget()
+    defaults = budget.get('default', {})
+    failures = []
+    for name, metrics in sorted(results.items()):
+        if metrics['status'] >= 400:
+            failures.append(f"{name}: returned HTTP {metrics['status']}")
+            continue
+        if name not in budget.get('views', {}):
+            failures.append(f'{name}: no budget entry in {BUDGET_PATH.name}')
+        limits = {**defaults, **budget.get('views', {}).get(name, {})}
+        for metric in ('queries', 'sql_ms', 'render_ms', 'peak_kb'):
+            limit = limits.get(f'max_{metric}')
+            if limit is not None and metrics[metric] > limit:
+                failures.append(f'{name}: {metric}={metrics[metric]} exceeds budget {limit}')
+    return failures
+
+
+def check_query_growth(small, large):
+    """Return violations for pages whose query count grew with the data set."""
+    failures = []
+    for name, metrics in sorted(large.items()):
+        baseline = small.get(name)
+        if baseline is not None and metrics['queries'] > baseline['queries']:
+            failures.append(
+                f"{name}: query count grew from {baseline['queries']} to {metrics['queries']}"
+            )
+    return failures
+
+
+def write_results(path, runs):
+    """Write ``runs`` (``{label: results}``) to ``path`` as JSON."""
+    with open(path, 'w') as handle:
+        json.dump(runs, handle, indent=2, sort_keys=True)
+
+
+def capture_render(client, path):
+    """
+    Request ``path`` and return ``(template_name, context, request)`` of the
+    page template it rendered, so the render can be repeated without the view.
+    """
+    renders = []
+    original_render = DjangoBackendTemplate.render
+
+    def capturing_render(template, context=None, request=None):
+        renders.append((template.template.name, context, request))
+        return original_render(template, context, request)
+
+    with mock.patch.object(DjangoBackendTemplate, 'render', capturing_render), \
+            override_settings(ASYNC_CONCURRENT_QUERIES=False):
+        _get(client, path)
+    # The page template is rendered first; includes do not go through the backend.
+    return renders[0]
+
+
+def template_backend(cached):
+    """A new backend with the project's template settings, with or without the cached loader."""
+    config = settings.TEMPLATES[0]
+    loaders = ['django.template.loaders.filesystem.Loader', 'django.template.loaders.app_directories.Loader']
+    if cached:
+        loaders = [('django.template.loaders.cached.Loader', loaders)]
+    options = {key: value for key, value in config.get('OPTIONS', {}).items() if key != 'loaders'}
+    return DjangoTemplates({
+        'NAME': 'benchmark',
+        'DIRS': config.get('DIRS', []),
+        'APP_DIRS': False,
+        'OPTIONS': {**options, 'loaders': loaders},
+    })
+
+
+def _time_render(backend, name, context, request):
+    started = time.perf_counter()
+    backend.get_template(name).render(context, request)
+    return (time.perf_counter() - started) * 1000
+
+
+def time_template_renders(name, context, request, repeat=20):
+    """
+    Median milliseconds to load and render template ``name`` with
+    ``context``, over ``repeat`` fresh template engines each:
+
+    * ``uncached``: loaders without caching, so every render reads and
+      compiles the template, ``base.html`` and the includes again,
+    * ``cached_cold``: the first render of a worker using the cached loader,
+    * ``cached_warm``: the first render after ``warm_templates`` ran at boot
+      (the time of which is ``warm_up``).
+    """
+    timings = {mode: [] for mode in (*TEMPLATE_MODES, 'warm_up')}
+    for _ in range(repeat):
+        timings['uncached'].append(_time_render(template_backend(cached=False), name, context, request))
+        timings['cached_cold'].append(_time_render(template_backend(cached=True), name, context, request))
+        backend = template_backend(cached=True)
+        started = time.perf_counter()
+        warm_templates(backend.engine)
+        timings['warm_up'].append((time.perf_counter() - started) * 1000)
+        timings['cached_warm'].append(_time_render(backend, name, context, request))
+    return {mode: round(statistics.median(values), 3) for mode, values in timings.items()}
+
+
+def benchmark_templates(client=None, pages=TEMPLATE_PAGES, repeat=20):
+    """``{url_name: {'template': name, mode: ms, ...}}`` for each page in ``pages``."""
+    if client is None:
+        client = Client()
+        client.force_login(get_staff_user())
+    results = {}
+    for page in pages:
+        name, context, request = capture_render(client, reverse(page))
+        results[page] = {'template': name, **time_template_renders(name, context, request, repeat)}
+    return results
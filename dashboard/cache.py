@@ -0,0 +1,190 @@
+"""
+Caching for the dashboard's aggregate blocks.
+
+Each block (catalog counts, order totals, status breakdown, ...) is cached
+separately in the ``dashboard`` cache and depends on a few models. Saving or
+deleting one of those models bumps the version of only the blocks that depend
+on it (after the transaction commits), so an order update leaves the catalog
+counts and low-stock list cached.
+
+Values are served with stale-while-revalidate semantics: an entry is fresh
+for ``DASHBOARD_CACHE_FRESH_SECONDS``; after that, or once its version has
+been bumped, the first request to notice takes a short lock and recomputes it
+while concurrent requests keep getting the previous value. Only a cold cache
+(nothing to serve at all) makes other requests wait for the recomputation.
+
+A block may be cached in several variants (e.g. one per time window); they
+share the block's version, so one write invalidates all of them.
+
+The same writes also bump a version stamp per model (``table_stamp``), which
+the ``{% fragment %}`` template tag (``dashboard/templatetags/fragments.py``)
+puts in its cache keys: a fragment is re-rendered only once a model it
+depends on has been written to.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+CACHE_ALIAS = 'dashboard'
+
+# Bump to invalidate every block when the shape of cached values changes.
+SCHEMA_VERSION = 1
+
+DEFAULT_FRESH_SECONDS = 60
+DEFAULT_STALE_SECONDS = 60 * 60
+DEFAULT_FRAGMENT_SECONDS = 24 * 60 * 60
+LOCK_SECONDS = 30
+COLD_WAIT_SECONDS = 5
+COLD_POLL_SECONDS = 0.05
+
+# Block name -> models (app_label.ModelName) whose writes invalidate it.
+BLOCKS = {
+    'catalog_counts': {'products.Product', 'products.Category'},
+    'order_totals': {'orders.Order', 'orders.OrderItem'},
+    'order_status': {'orders.Order'},
+    'top_products': {'orders.Order', 'orders.OrderItem', 'products.Product'},
+    # Creating and cancelling orders moves stock with queryset updates,
+    # which send no Product signals.
+    'low_stock': {'products.Product', 'products.Category', 'orders.Order'},
+    'recent_orders': {'orders.Order', 'accounts.Customer'},
+}
+
+# Models only template fragments depend on. Their writers call
+# ``invalidate_for_model`` themselves.
+FRAGMENT_MODELS = {'dashboard.InventorySnapshot'}
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _key(block, suffix):
+    return f'dashboard:{SCHEMA_VERSION}:{block}:{suffix}'
+
+
+def _version(cache, block):
+    version = cache.get(_key(block, 'version'))
+    if version is None:
+        # A version must outlive the values it guards.
+        cache.add(_key(block, 'version'), 1, timeout=None)
+        version = cache.get(_key(block, 'version'), 1)
+    return version
+
+
+def invalidate(block):
+    """Mark ``block`` out of date; the next read recomputes it."""
+    cache = get_cache()
+    try:
+        cache.incr(_key(block, 'version'))
+    except ValueError:
+        cache.set(_key(block, 'version'), 2, timeout=None)
+
+
+def invalidate_all():
+    """Invalidate every block and fragment, e.g. after bulk writes that bypass signals."""
+    for block in BLOCKS:
+        invalidate(block)
+    for label in tracked_models():
+        _bump_table(label)
+
+
+def _table_key(label):
+    return _key('table', label)
+
+
+def _bump_table(label):
+    cache = get_cache()
+    try:
+        cache.incr(_table_key(label))
+    except ValueError:
+        cache.set(_table_key(label), time.time_ns(), timeout=None)
+
+
+def table_stamp(labels):
+    """
+    Combined version stamp of the models in ``labels`` (``app_label.Model``),
+    read in one cache round trip. It changes whenever any of them is written.
+    """
+    keys = [_table_key(label) for label in sorted(labels)]
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from a new value rather than a fixed one, so fragments
+            # cached under an evicted stamp are never reused.
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def tracked_models():
+    """Models whose writes bump their stamps (those the blocks and fragments depend on)."""
+    return set().union(FRAGMENT_MODELS, *BLOCKS.values())
+
+
+def fragment_key(name, labels, vary=''):
+    """Cache key of a template fragment; it changes with the stamps of ``labels``."""
+    digest = hashlib.md5(f'{table_stamp(labels)}:{vary}'.encode(), usedforsecurity=False).hexdigest()
+    return _key('fragment', f'{name}:{digest}')
+
+
+def blocks_for_model(label):
+    return [block for block, models in BLOCKS.items() if label in models]
+
+
+def invalidate_for_model(label):
+    """Invalidate the blocks and fragments depending on ``label`` once the transaction commits."""
+    blocks = blocks_for_model(label)
+
+    def invalidate_blocks():
+        _bump_table(label)
+        for block in blocks:
+            invalidate(block)
+
+    transaction.on_commit(invalidate_blocks)
+
+
+def get_or_compute(block, compute, variant=None):
+    """Return the cached value of ``block`` (or of its ``variant``), calling ``compute()`` when needed."""
+    cache = get_cache()
+    suffix = '' if variant is None else f':{variant}'
+    value_key = _key(block, f'value{suffix}')
+    fresh_seconds = getattr(settings, 'DASHBOARD_CACHE_FRESH_SECONDS', DEFAULT_FRESH_SECONDS)
+    stale_seconds = getattr(settings, 'DASHBOARD_CACHE_STALE_SECONDS', DEFAULT_STALE_SECONDS)
+
+    version = _version(cache, block)
+    entry = cache.get(value_key)
+    now = time.time()
+    if entry is not None and entry['version'] == version and now < entry['fresh_until']:
+        return entry['value']
+
+    lock_key = _key(block, f'lock{suffix}:{version}')
+    if cache.add(lock_key, 1, timeout=LOCK_SECONDS):
+        try:
+            value = compute()
+            cache.set(
+                value_key,
+                {'version': version, 'value': value, 'fresh_until': time.time() + fresh_seconds},
+                timeout=fresh_seconds + stale_seconds,
+            )
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        # Someone else is recomputing; serve the previous value meanwhile.
+        return entry['value']
+
+    # Cold cache: wait briefly for the request holding the lock.
+    deadline = time.time() + COLD_WAIT_SECONDS
+    while time.time() < deadline:
+        time.sleep(COLD_POLL_SECONDS)
+        entry = cache.get(value_key)
+        if entry is not None:
+            return entry['value']
+    return compute()
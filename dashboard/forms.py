@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from django import forms
+from django.utils import timezone
+
+from orders.models import Order
+from products.models import Category
+
+from .stats import GRANULARITIES, bucket_count
+
+
+# Lengths (in days) offered as shortcuts for the analytics range.
+ANALYTICS_RANGES = (7, 30, 90, 365)
+# Upper bound on the buckets of one sales series, so a request cannot ask
+# for, say, every hour of five years.
+MAX_BUCKETS = 400
+DEFAULT_STATUS = 'delivered'
+ALL_STATUSES = 'all'
+
+
+class AnalyticsFilterForm(forms.Form):
+    """
+    Filters for the analytics sales series. Every field is optional: the
+    range defaults to the ``days`` (7 by default) ending today, the series
+    to daily delivered orders across all categories.
+    """
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+    days = forms.TypedChoiceField(
+        choices=[(days, f'{days}d') for days in ANALYTICS_RANGES],
+        coerce=int,
+        required=False,
+    )
+    granularity = forms.ChoiceField(choices=[(name, name.title()) for name in GRANULARITIES], required=False)
+    status = forms.ChoiceField(
+        choices=[(ALL_STATUSES, 'All statuses')] + Order._meta.get_field('status').choices,
+        required=False,
+    )
+    category = forms.ModelChoiceField(queryset=Category.objects.all(), required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        end = cleaned_data.get('end') or timezone.localdate()
+        # ``days`` only applies without an explicit start.
+        days = None if cleaned_data.get('start') else cleaned_data.get('days') or ANALYTICS_RANGES[0]
+        start = cleaned_data.get('start') or end - timedelta(days=days - 1)
+        granularity = cleaned_data.get('granularity') or 'day'
+        if start > end:
+            raise forms.ValidationError('The start date must not be after the end date.')
+        if bucket_count(start, end, granularity) > MAX_BUCKETS:
+            raise forms.ValidationError(
+                f'That range has more than {MAX_BUCKETS} {granularity} buckets; '
+                'pick a shorter range or a coarser granularity.'
+            )
+        cleaned_data.update(
+            start=start,
+            end=end,
+            days=days,
+            granularity=granularity,
+            status=cleaned_data.get('status') or DEFAULT_STATUS,
+        )
+        return cleaned_data
@@ -0,0 +1,124 @@
+"""
+The :class:`~dashboard.models.InventorySnapshot` table.
+
+``refresh_snapshot`` recomputes every product's stock health in one query:
+
+* ``units_sold``: units on orders that were not cancelled over the last
+  ``INVENTORY_VELOCITY_DAYS`` days, and ``daily_velocity``, units per day,
+* ``days_of_cover``: how many days the current stock lasts at that velocity,
+* ``reorder_point``: the stock that lasts the supplier lead time plus the
+  safety days (``INVENTORY_LEAD_TIME_DAYS`` + ``INVENTORY_SAFETY_DAYS``),
+* ``reorder_quantity``: for products at or below their reorder point, the
+  units that bring the stock to ``INVENTORY_TARGET_COVER_DAYS`` of cover
+  after the lead time.
+
+Velocities are computed per product by one correlated subquery and the
+rest with SQL arithmetic, so a refresh is one ``SELECT`` plus the bulk
+insert, however many products and orders there are. The table is replaced
+as a whole inside a transaction; readers see either the old or the new
+snapshot. Run ``refresh_inventory_snapshot`` periodically (and after bulk
+loads), since stock changes between refreshes are not reflected.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Ceil, Coalesce, Greatest
+from django.utils import timezone
+
+from orders.models import OrderItem
+from products.models import Product
+
+from . import cache as dashboard_cache
+from .models import InventorySnapshot
+from .rankings import EXCLUDED_STATUSES
+
+
+DEFAULT_VELOCITY_DAYS = 30
+DEFAULT_LEAD_TIME_DAYS = 7
+DEFAULT_SAFETY_DAYS = 3
+DEFAULT_TARGET_COVER_DAYS = 30
+
+
+def get_parameters():
+    """``(velocity_days, lead_time_days, safety_days, target_cover_days)`` from the settings."""
+    return (
+        getattr(settings, 'INVENTORY_VELOCITY_DAYS', DEFAULT_VELOCITY_DAYS),
+        getattr(settings, 'INVENTORY_LEAD_TIME_DAYS', DEFAULT_LEAD_TIME_DAYS),
+        getattr(settings, 'INVENTORY_SAFETY_DAYS', DEFAULT_SAFETY_DAYS),
+        getattr(settings, 'INVENTORY_TARGET_COVER_DAYS', DEFAULT_TARGET_COVER_DAYS),
+    )
+
+
+def _units_for(units, days, window):
+    # Units needed for ``days`` of cover, rounded up. Multiplying before
+    # dividing keeps whole results exact (9 units * 10 days / 30 days = 3).
+    return Ceil(Cast(F(units) * days, FloatField()) / window)
+
+
+def snapshot_rows(now=None):
+    """
+    Values of every product's snapshot row as of ``now``, computed by one
+    query. Returns a ``values()`` queryset.
+    """
+    now = now or timezone.now()
+    window, lead_time, safety, target_cover = get_parameters()
+    sold = (
+        OrderItem.objects.filter(product=OuterRef('pk'), order__created_at__gte=now - timedelta(days=window))
+        .exclude(order__status__in=EXCLUDED_STATUSES)
+        .values('product')
+        .annotate(units=Sum('quantity'))
+        .values('units')
+    )
+    return Product.objects.annotate(
+        units_sold=Coalesce(Subquery(sold, output_field=IntegerField()), 0),
+        daily_velocity=Cast(F('units_sold'), FloatField()) / window,
+        days_of_cover=Case(
+            When(units_sold=0, then=Value(None)),
+            default=Cast(Greatest(F('stock_quantity'), 0) * window, FloatField()) / F('units_sold'),
+            output_field=FloatField(),
+        ),
+        reorder_point=_units_for('units_sold', lead_time + safety, window),
+        reorder_quantity=Case(
+            When(
+                units_sold__gt=0,
+                stock_quantity__lte=F('reorder_point'),
+                then=Greatest(_units_for('units_sold', lead_time + target_cover, window) - F('stock_quantity'), 0),
+            ),
+            default=0,
+            output_field=FloatField(),
+        ),
+    ).values(
+        'product_id', 'name', 'category_id', 'category__name', 'price', 'stock_quantity', 'created_at',
+        'units_sold', 'daily_velocity', 'days_of_cover', 'reorder_point', 'reorder_quantity',
+    ).order_by()
+
+
+def refresh_snapshot(batch_size=500):
+    """Replace the snapshot table with the current state of every product; returns the row count."""
+    now = timezone.now()
+    snapshots = [
+        InventorySnapshot(
+            product_id=row['product_id'],
+            product_name=row['name'],
+            category_id=row['category_id'],
+            category_name=row['category__name'],
+            price=row['price'],
+            stock_quantity=row['stock_quantity'],
+            product_created_at=row['created_at'],
+            units_sold=row['units_sold'],
+            daily_velocity=row['daily_velocity'],
+            days_of_cover=row['days_of_cover'],
+            reorder_point=int(row['reorder_point']),
+            reorder_quantity=int(row['reorder_quantity']),
+            refreshed_at=now,
+        )
+        for row in snapshot_rows(now)
+    ]
+    with transaction.atomic():
+        InventorySnapshot.objects.all().delete()
+        InventorySnapshot.objects.bulk_create(snapshots, batch_size=batch_size)
+        dashboard_cache.invalidate_for_model('dashboard.InventorySnapshot')
+    return len(snapshots)
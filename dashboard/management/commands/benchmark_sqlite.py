@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand
+
+from ecommerce.sqlite import benchmark_concurrency, get_pragmas
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent SQLite reader/writer throughput with default and tuned pragmas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4, help='Reader threads.')
+        parser.add_argument('--writers', type=int, default=2, help='Writer threads.')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run.')
+        parser.add_argument('--rows', type=int, default=2000, help='Products in the benchmark table.')
+        parser.add_argument(
+            '--dir',
+            help='Directory for the scratch database (default: a temporary directory); '
+                 'use the disk the real database lives on.',
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory(dir=options['dir']) as directory:
+            path = os.path.join(directory, 'benchmark.sqlite3')
+            runs = {}
+            for label, pragmas in (('default', None), ('tuned', get_pragmas())):
+                runs[label] = benchmark_concurrency(
+                    path,
+                    pragmas,
+                    readers=options['readers'],
+                    writers=options['writers'],
+                    seconds=options['seconds'],
+                    rows=options['rows'],
+                )
+                stats = runs[label]
+                self.stdout.write(
+                    f"{label:>8}: {stats['reads_per_second']:>10,.0f} reads/s "
+                    f"{stats['writes_per_second']:>10,.0f} writes/s "
+                    f"{stats['locked']:>6} locked errors"
+                )
+
+        default, tuned = runs['default'], runs['tuned']
+        self.stdout.write(self.style.SUCCESS(
+            f"Tuned vs default: reads x{_ratio(tuned['reads'], default['reads'])}, "
+            f"writes x{_ratio(tuned['writes'], default['writes'])}"
+        ))
+
+
+def _ratio(new, old):
+    return f'{new / old:.1f}' if old else 'inf'
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from dashboard import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Compare page template render times with and without the cached template loader'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=100,
+            help='Customers/products/orders/payments to generate for the pages.',
+        )
+        parser.add_argument('--repeat', type=int, default=20, help='Renders per page and mode.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated data.')
+
+    def handle(self, *args, **options):
+        # The test client sends Host: testserver.
+        allowed_hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(ALLOWED_HOSTS=allowed_hosts), transaction.atomic():
+            benchmark.seed(options['size'], seed_value=options['seed'])
+            results = benchmark.benchmark_templates(repeat=options['repeat'])
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"{'template':<32}{'uncached ms':>13}{'cold ms':>10}{'warm ms':>10}{'warm-up ms':>12}{'speedup':>9}"
+        )
+        for metrics in results.values():
+            speedup = metrics['uncached'] / metrics['cached_warm'] if metrics['cached_warm'] else 0
+            self.stdout.write(
+                f"{metrics['template']:<32}{metrics['uncached']:>13.2f}{metrics['cached_cold']:>10.2f}"
+                f"{metrics['cached_warm']:>10.2f}{metrics['warm_up']:>12.2f}{speedup:>8.1f}x"
+            )
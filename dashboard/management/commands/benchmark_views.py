@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from dashboard import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Measure query count, SQL/render time and memory of every staff page'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[100, 1000],
+            help='Data volumes to measure at; each adds this many customers/products/orders/payments.',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated data.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the generated rows instead of rolling them back at the end.',
+        )
+
+    def handle(self, *args, **options):
+        runs = {}
+        failures = []
+
+        # The test client sends Host: testserver.
+        allowed_hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        try:
+            with override_settings(ALLOWED_HOSTS=allowed_hosts), transaction.atomic():
+                seeded = 0
+                for size in sorted(options['sizes']):
+                    benchmark.seed(size - seeded, seed_value=options['seed'] + size)
+                    seeded = size
+                    results = benchmark.measure_all()
+                    runs[str(size)] = results
+                    self._report(size, results)
+                    failures.extend(f'[n={size}] {failure}' for failure in benchmark.check_budget(results))
+
+                sizes = sorted(runs, key=int)
+                for smaller, larger in zip(sizes, sizes[1:]):
+                    failures.extend(benchmark.check_query_growth(runs[smaller], runs[larger]))
+
+                if not options['keep']:
+                    transaction.set_rollback(True)
+        finally:
+            if options['output']:
+                benchmark.write_results(options['output'], runs)
+                self.stdout.write(f"Results written to {options['output']}")
+
+        if failures:
+            raise CommandError('Performance budget exceeded:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('All views within budget'))
+
+    def _report(self, size, results):
+        self.stdout.write(f'\nn={size}')
+        self.stdout.write(f"{'view':<24}{'status':>7}{'queries':>9}{'sql ms':>10}{'render ms':>11}{'peak KiB':>10}")
+        for name, metrics in sorted(results.items()):
+            self.stdout.write(
+                f"{name:<24}{metrics['status']:>7}{metrics['queries']:>9}"
+                f"{metrics['sql_ms']:>10.1f}{metrics['render_ms']:>11.1f}{metrics['peak_kb']:>10.1f}"
+            )
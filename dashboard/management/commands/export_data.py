@@ -0,0 +1,47 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.views import CUSTOMER_EXPORT_COLUMNS, customer_export_queryset
+from ecommerce.exports import FORMATS, iter_export, iter_rows
+from orders.views import ORDER_EXPORT_COLUMNS, order_export_queryset
+from payments.views import PAYMENT_EXPORT_COLUMNS, payment_export_queryset
+
+
+EXPORTS = {
+    'orders': (order_export_queryset, ORDER_EXPORT_COLUMNS),
+    'payments': (payment_export_queryset, PAYMENT_EXPORT_COLUMNS),
+    'customers': (customer_export_queryset, CUSTOMER_EXPORT_COLUMNS),
+}
+
+
+class Command(BaseCommand):
+    help = 'Stream orders, payments or customers as CSV or NDJSON, with the admin list filters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--status', help='Only rows with this status (orders, payments).')
+        parser.add_argument('--search', help='Same search as the admin list page.')
+        parser.add_argument('--product', help='Only orders containing this product id.')
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched from the database at a time.')
+        parser.add_argument('--output', help='Write to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        get_queryset, columns = EXPORTS[options['kind']]
+        params = {
+            key: options[key] for key in ('status', 'search', 'product') if options[key]
+        }
+        try:
+            queryset = get_queryset(params)
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+        rows = iter_rows(queryset, columns, chunk_size=options['chunk_size'])
+        lines = iter_export(options['format'], columns, rows)
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as handle:
+                handle.writelines(lines)
+            self.stderr.write(self.style.SUCCESS(f"Exported {options['kind']} to {options['output']}"))
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
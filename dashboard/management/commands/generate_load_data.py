@@ -0,0 +1,410 @@
+import multiprocessing
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.counters import recount_customers
+from accounts.models import Customer
+from dashboard.inventory import refresh_snapshot
+from dashboard.rollups import rebuild_all
+from orders.models import Order, OrderItem
+from payments.models import Payment
+from products.counters import recount_categories
+from products.models import Category, Product
+from search.index import rebuild as rebuild_search_index
+
+
+STATUSES = ['pending', 'processing', 'shipped', 'delivered', 'cancelled']
+STATUS_WEIGHTS = [8, 7, 10, 65, 10]
+PAYMENT_METHODS = ['credit_card', 'paypal', 'bank_transfer']
+PAYMENT_METHOD_WEIGHTS = [70, 22, 8]
+
+# Relative order volume by weekday (Mon..Sun) and by hour of day.
+WEEKDAY_WEIGHTS = [1.0, 0.95, 0.95, 1.0, 1.1, 1.35, 1.25]
+HOUR_WEIGHTS = [
+    1, 0.6, 0.4, 0.3, 0.3, 0.4, 0.8, 1.5, 2.2, 2.8, 3.0, 3.2,
+    3.4, 3.3, 3.1, 3.0, 3.1, 3.4, 3.9, 4.3, 4.4, 3.8, 2.8, 1.8,
+]
+
+CATEGORY_NAMES = [
+    'Electronics', 'Clothing', 'Books', 'Home & Garden', 'Sports & Outdoors',
+    'Toys & Games', 'Food & Beverages', 'Health & Beauty', 'Automotive', 'Office Supplies',
+]
+
+
+@contextmanager
+def keep_explicit_timestamps():
+    """
+    ``auto_now_add``/``auto_now`` fields overwrite whatever value is set on
+    insert. Switch them off while loading so generated history keeps its
+    spread of ``created_at`` values.
+    """
+    fields = [
+        Order._meta.get_field('created_at'),
+        Payment._meta.get_field('created_at'),
+        Payment._meta.get_field('updated_at'),
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _chunk_rng(seed, chunk_index):
+    # One generator per chunk keeps the output identical however the chunks
+    # are spread across worker processes.
+    return random.Random(seed * 1_000_003 + chunk_index)
+
+
+class _DateSampler:
+    """Draws order timestamps between two dates with growth and weekly/daily cycles."""
+
+    def __init__(self, start, end, growth):
+        self.start = start
+        days = max((end - start).days, 1)
+        weights = []
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            trend = 1 + growth * offset / days
+            weights.append(trend * WEEKDAY_WEIGHTS[day.weekday()])
+        self.day_offsets = list(range(days))
+        self.day_weights = list(_cumulative(weights))
+        self.hour_weights = list(_cumulative(HOUR_WEIGHTS))
+
+    def sample(self, rng):
+        day = rng.choices(self.day_offsets, cum_weights=self.day_weights)[0]
+        hour = rng.choices(range(24), cum_weights=self.hour_weights)[0]
+        return self.start + timedelta(days=day, hours=hour, seconds=rng.randrange(3600))
+
+
+def _cumulative(values):
+    total = 0
+    for value in values:
+        total += value
+        yield total
+
+
+def generate_chunk(plan, chunk_index):
+    """
+    Insert one chunk of orders with their items and payments inside a single
+    transaction. Primary keys come from ranges reserved per chunk in ``plan``
+    so chunks can be written from several processes without colliding.
+    Returns the number of rows inserted.
+    """
+    rng = _chunk_rng(plan['seed'], chunk_index)
+    first = chunk_index * plan['chunk_size']
+    count = min(plan['chunk_size'], plan['orders'] - first)
+    order_id = plan['order_base'] + first
+    item_id = plan['item_base'] + first * plan['max_items']
+    payment_id = plan['payment_base'] + first
+    sampler = _DateSampler(plan['start'], plan['end'], plan['growth'])
+    customer_ids = plan['customer_ids']
+    products = plan['products']
+
+    orders, items, payments = [], [], []
+    for offset in range(count):
+        created_at = sampler.sample(rng)
+        status = rng.choices(STATUSES, weights=STATUS_WEIGHTS)[0]
+        total = Decimal('0.00')
+        line_count = rng.randint(plan['min_items'], plan['max_items'])
+        for product_id, price in rng.sample(products, min(line_count, len(products))):
+            quantity = rng.choices((1, 2, 3, 4), weights=(70, 20, 7, 3))[0]
+            items.append(OrderItem(
+                order_item_id=item_id,
+                order_id=order_id,
+                product_id=product_id,
+                quantity=quantity,
+                price=price,
+            ))
+            item_id += 1
+            total += price * quantity
+        orders.append(Order(
+            order_id=order_id,
+            customer_id=rng.choice(customer_ids),
+            total_amount=total,
+            status=status,
+            created_at=created_at,
+        ))
+        if status != 'pending':
+            paid_at = created_at + timedelta(minutes=rng.randint(1, 120))
+            payments.append(Payment(
+                payment_id=payment_id,
+                order_id=order_id,
+                payment_method=rng.choices(PAYMENT_METHODS, weights=PAYMENT_METHOD_WEIGHTS)[0],
+                amount=total,
+                transaction_id=f'LOAD-{order_id}',
+                status='refunded' if status == 'cancelled' else 'completed',
+                created_at=paid_at,
+                updated_at=paid_at,
+            ))
+        order_id += 1
+        payment_id += 1
+        # Leave the unused part of this order's item id block empty.
+        item_id = plan['item_base'] + (first + offset + 1) * plan['max_items']
+
+    batch_size = plan['batch_size']
+    with keep_explicit_timestamps(), transaction.atomic():
+        Order.objects.bulk_create(orders, batch_size=batch_size)
+        OrderItem.objects.bulk_create(items, batch_size=batch_size)
+        Payment.objects.bulk_create(payments, batch_size=batch_size)
+    return len(orders) + len(items) + len(payments)
+
+
+def _init_worker():
+    # Connections inherited from the parent process must not be shared.
+    for conn in connections.all():
+        conn.close()
+        if conn.vendor == 'sqlite':
+            # SQLite allows one writer at a time. Wait for the other workers'
+            # chunks instead of failing with "database is locked"; building
+            # the rows still happens in parallel.
+            conn.settings_dict.setdefault('OPTIONS', {})['timeout'] = 600
+
+
+def _worker_generate_chunk(args):
+    plan, chunk_index = args
+    return generate_chunk(plan, chunk_index)
+
+
+class Command(BaseCommand):
+    help = 'Generate a large, reproducible synthetic data set with bulk inserts for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=10000)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=100000)
+        parser.add_argument(
+            '--items',
+            type=int,
+            help='Total order items to aim for (default: 3 per order). Per-order counts are randomised around the average.',
+        )
+        parser.add_argument('--start', help='First order date, YYYY-MM-DD (default: two years ago).')
+        parser.add_argument('--end', help='Last order date, YYYY-MM-DD (default: today).')
+        parser.add_argument(
+            '--growth',
+            type=float,
+            default=1.0,
+            help='How much busier the last day is than the first (1.0 = twice as busy).',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed gives the same data.')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT statement.')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Orders per transaction.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes inserting disjoint id ranges in parallel (requires fork; SQLite gains little).',
+        )
+        parser.add_argument(
+            '--skip-rollup',
+            action='store_true',
+            help='Do not rebuild the daily sales rollup afterwards.',
+        )
+        parser.add_argument(
+            '--skip-search-index',
+            action='store_true',
+            help='Do not rebuild the search index afterwards (run rebuild_search_index later).',
+        )
+        parser.add_argument(
+            '--skip-recount',
+            action='store_true',
+            help='Do not recompute the customer and category counters afterwards (run recount later).',
+        )
+        parser.add_argument(
+            '--skip-snapshot',
+            action='store_true',
+            help='Do not refresh the inventory snapshot afterwards (run refresh_inventory_snapshot later).',
+        )
+
+    def handle(self, *args, **options):
+        if options['orders'] < 1 or options['customers'] < 1 or options['products'] < 1:
+            raise CommandError('--orders, --customers and --products must be positive.')
+
+        end = self._parse_date(options['end']) if options['end'] else timezone.localdate()
+        start = self._parse_date(options['start']) if options['start'] else end - timedelta(days=730)
+        if start >= end:
+            raise CommandError('--start must be before --end.')
+
+        orders = options['orders']
+        average_items = (options['items'] or orders * 3) / orders
+        min_items = max(1, round(average_items / 2))
+        max_items = max(min_items, round(average_items * 2) - min_items)
+
+        started = time.perf_counter()
+        rng = random.Random(options['seed'])
+
+        with keep_explicit_timestamps(), transaction.atomic():
+            categories = self._categories()
+            customer_ids = self._customers(options['customers'], start, rng, options['batch_size'])
+            products = self._products(options['products'], categories, rng, options['batch_size'])
+        base_rows = options['customers'] + options['products']
+        self._report('customers and products', base_rows, started)
+
+        plan = {
+            'seed': options['seed'],
+            'orders': orders,
+            'chunk_size': options['chunk_size'],
+            'batch_size': options['batch_size'],
+            'min_items': min_items,
+            'max_items': max_items,
+            'start': self._aware(start),
+            'end': self._aware(end + timedelta(days=1)),
+            'growth': options['growth'],
+            'customer_ids': customer_ids,
+            'products': products,
+            'order_base': (Order.objects.aggregate(m=Max('order_id'))['m'] or 0) + 1,
+            'item_base': (OrderItem.objects.aggregate(m=Max('order_item_id'))['m'] or 0) + 1,
+            'payment_base': (Payment.objects.aggregate(m=Max('payment_id'))['m'] or 0) + 1,
+        }
+        chunks = range((orders + plan['chunk_size'] - 1) // plan['chunk_size'])
+
+        order_started = time.perf_counter()
+        inserted = 0
+        for rows in self._run_chunks(plan, chunks, options['workers']):
+            inserted += rows
+            elapsed = time.perf_counter() - order_started
+            self.stdout.write(f'  {inserted:,} order/item/payment rows ({inserted / elapsed:,.0f} rows/s)')
+        self._reset_sequences()
+        self._report('orders, items and payments', inserted, order_started)
+
+        if not options['skip_rollup']:
+            rollup_started = time.perf_counter()
+            self._report('sales rollup rows', rebuild_all(), rollup_started)
+
+        # Customers and products were bulk inserted without signals.
+        if not options['skip_search_index']:
+            index_started = time.perf_counter()
+            self._report('search documents', rebuild_search_index(), index_started)
+        if not options['skip_recount']:
+            counters_started = time.perf_counter()
+            counters = recount_customers() + recount_categories()
+            self.stdout.write(
+                f'Recounted {counters:,} customer/category counters in {time.perf_counter() - counters_started:.1f}s'
+            )
+        if not options['skip_snapshot']:
+            snapshot_started = time.perf_counter()
+            self._report('inventory snapshot rows', refresh_snapshot(), snapshot_started)
+
+        total = base_rows + inserted
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)'
+        ))
+
+    def _run_chunks(self, plan, chunks, workers):
+        if workers <= 1:
+            for chunk_index in chunks:
+                yield generate_chunk(plan, chunk_index)
+            return
+
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError('--workers > 1 needs the fork start method, which this platform lacks.')
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError('--workers > 1 cannot share an in-memory SQLite database.')
+
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(workers, initializer=_init_worker) as pool:
+            yield from pool.imap_unordered(_worker_generate_chunk, ((plan, index) for index in chunks))
+
+    def _categories(self):
+        existing = {category.name: category for category in Category.objects.all()}
+        missing = [
+            Category(name=name, description=f'{name} (generated)')
+            for name in CATEGORY_NAMES if name not in existing
+        ]
+        Category.objects.bulk_create(missing)
+        return list(Category.objects.all())
+
+    def _customers(self, count, start, rng, batch_size):
+        prefix = f'load{Customer.objects.aggregate(m=Max("id"))["m"] or 0}_'
+        joined_from = self._aware(start - timedelta(days=365))
+        span = int((self._aware(start) - joined_from).total_seconds())
+        customers = Customer.objects.bulk_create(
+            (
+                Customer(
+                    username=f'{prefix}{index}',
+                    email=f'{prefix}{index}@example.com',
+                    password='!',
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    phone_number=f'555-{rng.randrange(10000):04d}',
+                    date_joined=joined_from + timedelta(seconds=rng.randrange(span)),
+                )
+                for index in range(count)
+            ),
+            batch_size=batch_size,
+        )
+        if customers and customers[0].pk is None:
+            return list(Customer.objects.filter(username__startswith=prefix).values_list('pk', flat=True))
+        return [customer.pk for customer in customers]
+
+    def _products(self, count, categories, rng, batch_size):
+        # Product names are not unique, so recognise this run's rows by their
+        # primary keys instead of a name prefix.
+        last_pk = Product.objects.aggregate(m=Max('product_id'))['m'] or 0
+        products = Product.objects.bulk_create(
+            (
+                Product(
+                    name=f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} #{index}',
+                    description='Generated for load testing.',
+                    price=Decimal(int(rng.lognormvariate(3.5, 0.9))) + Decimal('0.99'),
+                    category=rng.choice(categories),
+                    stock_quantity=rng.randint(0, 500),
+                )
+                for index in range(count)
+            ),
+            batch_size=batch_size,
+        )
+        if products and products[0].pk is None:
+            return list(Product.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'price'))
+        return [(product.pk, product.price) for product in products]
+
+    def _reset_sequences(self):
+        # Explicit primary keys bypass Postgres sequences; move them past the
+        # inserted ids. No-op on SQLite.
+        statements = connection.ops.sequence_reset_sql(no_style(), [Order, OrderItem, Payment])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def _report(self, label, rows, started):
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(f'Inserted {rows:,} {label} in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)')
+
+    @staticmethod
+    def _parse_date(value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD.')
+
+    @staticmethod
+    def _aware(day):
+        value = datetime.combine(day, datetime.min.time())
+        return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+FIRST_NAMES = [
+    'Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn',
+    'Maria', 'James', 'Wei', 'Aisha', 'Luca', 'Priya', 'Noah', 'Emma', 'Omar', 'Sofia',
+]
+LAST_NAMES = [
+    'Smith', 'Garcia', 'Chen', 'Patel', 'Johnson', 'Kim', 'Nguyen', 'Brown', 'Rossi', 'Silva',
+    'Müller', 'Ahmed', 'Williams', 'Lopez', 'Khan', 'Martin', 'Lee', 'Jones', 'Wilson', 'Clark',
+]
+ADJECTIVES = ['Classic', 'Premium', 'Compact', 'Deluxe', 'Eco', 'Smart', 'Ultra', 'Vintage', 'Pro', 'Essential']
+NOUNS = ['Lamp', 'Backpack', 'Headphones', 'Mug', 'Notebook', 'Jacket', 'Blender', 'Tent', 'Puzzle', 'Watch']
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.rollups import rebuild_all
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily sales rollup table from all orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rollup rows inserted per INSERT statement.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_all(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {count} rollup rows in {elapsed:.2f}s')
+        )
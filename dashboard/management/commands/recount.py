@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.counters import recount_customers
+from dashboard.cache import invalidate_for_model
+from products.counters import recount_categories
+
+
+# kind -> (recount function, fields, model label)
+COUNTERS = {
+    'customers': (recount_customers, 'order_count, lifetime_value', 'accounts.Customer'),
+    'categories': (recount_categories, 'product_count, total_stock', 'products.Category'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalised customer and category counters, repairing any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'kinds',
+            nargs='*',
+            help=f"Counters to recompute: {', '.join(sorted(COUNTERS))} (default: all).",
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['kinds']) - set(COUNTERS)
+        if unknown:
+            raise CommandError(f"Unknown counters: {', '.join(sorted(unknown))}")
+        for kind in options['kinds'] or sorted(COUNTERS):
+            recount, fields, label = COUNTERS[kind]
+            started = time.perf_counter()
+            drifted = recount()
+            elapsed = time.perf_counter() - started
+            if drifted:
+                # The corrected counters bypass model signals.
+                invalidate_for_model(label)
+            self.stdout.write(self.style.SUCCESS(
+                f'Recounted {kind} ({fields}) in {elapsed:.2f}s: {drifted} corrected'
+            ))
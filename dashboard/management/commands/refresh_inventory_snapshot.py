@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.inventory import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Recompute the inventory snapshot (sales velocity, days of cover, reorder suggestions)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of snapshot rows inserted per INSERT statement.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = refresh_snapshot(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'Refreshed the inventory snapshot of {count} products in {elapsed:.2f}s')
+        )
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from ecommerce.sqlite import run_maintenance
+
+
+class Command(BaseCommand):
+    help = (
+        'Refresh SQLite query planner statistics (PRAGMA optimize) and truncate the '
+        'write-ahead log; run it periodically, e.g. hourly from cron'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to maintain.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError(f"Database {options['database']!r} is not SQLite.")
+        started = time.perf_counter()
+        journal_mode, checkpoint = run_maintenance(connection)
+        elapsed = time.perf_counter() - started
+        message = f'Optimized in {elapsed:.2f}s (journal_mode={journal_mode})'
+        if checkpoint is not None:
+            busy, wal_pages, checkpointed = checkpoint
+            message += f'; checkpointed {checkpointed} of {wal_pages} WAL pages' + (' (busy)' if busy else '')
+        self.stdout.write(self.style.SUCCESS(message))
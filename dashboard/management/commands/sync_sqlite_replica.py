@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from ecommerce.routers import REPLICA, replica_configured
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the SQLite primary database into the SQLite replica file, to try the '
+        'replica routing locally (Postgres replicas are kept current by replication)'
+    )
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError('No replica database is configured; set DATABASE_REPLICA_URL.')
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections[REPLICA]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('Only SQLite primaries and replicas can be copied.')
+        if primary.settings_dict['NAME'] == replica.settings_dict['NAME']:
+            raise CommandError('The primary and the replica are the same file.')
+
+        started = time.perf_counter()
+        primary.ensure_connection()
+        replica.ensure_connection()
+        # The online backup API copies a consistent snapshot page by page.
+        primary.connection.backup(replica.connection)
+        self.stdout.write(self.style.SUCCESS(
+            f"Copied {primary.settings_dict['NAME']} to {replica.settings_dict['NAME']} "
+            f'in {time.perf_counter() - started:.2f}s'
+        ))
@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-18 18:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_image_renditions'),
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_name', models.CharField(max_length=100)),
+                ('category_name', models.CharField(max_length=50)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('stock_quantity', models.IntegerField()),
+                ('product_created_at', models.DateTimeField()),
+                ('units_sold', models.PositiveIntegerField(default=0)),
+                ('daily_velocity', models.FloatField(default=0)),
+                ('days_of_cover', models.FloatField(blank=True, null=True)),
+                ('reorder_point', models.PositiveIntegerField(default=0)),
+                ('reorder_quantity', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField()),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.category')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='inventorysnapshot',
+            index=models.Index(fields=['stock_quantity'], name='inventorysnapshot_stock'),
+        ),
+    ]
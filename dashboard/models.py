@@ -0,0 +1,79 @@
+from django.db import models
+from django.db.models import Q
+
+from products.models import Category, Product
+
+
+class DailySalesRollup(models.Model):
+    """
+    Pre-aggregated sales per day, order status and product category.
+
+    Rows with ``category=None`` hold order-level totals for the day and status
+    (``revenue`` is the sum of ``Order.total_amount``). Rows with a category
+    hold the line-item totals for products in that category, so an order that
+    spans two categories is counted once in each of them.
+    """
+    date = models.DateField()
+    status = models.CharField(max_length=20)
+    category = models.ForeignKey(
+        Category,
+        related_name='+',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    order_count = models.PositiveIntegerField(default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'status', 'category'],
+                name='dailysalesrollup_unique_category_bucket',
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'status'],
+                condition=Q(category__isnull=True),
+                name='dailysalesrollup_unique_order_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'status'], name='dailysalesrollup_date_status'),
+        ]
+
+    def __str__(self):
+        category = self.category_id or 'all'
+        return f"{self.date} {self.status} ({category}): {self.order_count} orders"
+
+
+class InventorySnapshot(models.Model):
+    """
+    Precomputed stock health of one product, rebuilt as a whole by
+    ``refresh_inventory_snapshot`` (see ``dashboard/inventory.py``).
+
+    The product's name, category, price and stock are copied in so the
+    inventory page reads this table alone. ``days_of_cover`` is ``None`` for
+    products that sold nothing in the velocity window.
+    """
+    product = models.OneToOneField(Product, related_name='+', on_delete=models.CASCADE)
+    product_name = models.CharField(max_length=100)
+    category = models.ForeignKey(Category, related_name='+', on_delete=models.CASCADE)
+    category_name = models.CharField(max_length=50)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    stock_quantity = models.IntegerField()
+    product_created_at = models.DateTimeField()
+    units_sold = models.PositiveIntegerField(default=0)
+    daily_velocity = models.FloatField(default=0)
+    days_of_cover = models.FloatField(null=True, blank=True)
+    reorder_point = models.PositiveIntegerField(default=0)
+    reorder_quantity = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['stock_quantity'], name='inventorysnapshot_stock'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_name}: {self.stock_quantity} in stock"
@@ -0,0 +1,143 @@
+"""
+Maintenance of the :class:`~dashboard.models.DailySalesRollup` table.
+
+Whenever an order or order item changes, the rollup rows for that order's day
+are recomputed from the source tables once the surrounding transaction
+commits. Recomputing a whole day keeps the rows exact through status changes,
+edits and deletes while only ever touching one day of orders.
+``rebuild_sales_rollup`` regenerates the whole table (use it after bulk loads,
+which bypass model signals).
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+
+from . import cache as dashboard_cache
+from .models import DailySalesRollup
+
+
+def day_start(day):
+    """Return the first instant of ``day`` in the current time zone."""
+    start = datetime.combine(day, time.min)
+    if settings.USE_TZ:
+        start = timezone.make_aware(start)
+    return start
+
+
+def _day_range_filter(days, prefix=''):
+    """Match rows whose ``created_at`` falls on any of ``days``."""
+    condition = Q()
+    for day in days:
+        start = day_start(day)
+        condition |= Q(**{
+            f'{prefix}created_at__gte': start,
+            f'{prefix}created_at__lt': start + timedelta(days=1),
+        })
+    return condition
+
+
+def compute_rollups(days=None):
+    """
+    Build (unsaved) rollup rows from the order tables, optionally restricted
+    to an iterable of dates. Three grouped queries regardless of volume.
+    """
+    orders = Order.objects.all()
+    items = OrderItem.objects.all()
+    if days is not None:
+        days = list(days)
+        if not days:
+            return []
+        orders = orders.filter(_day_range_filter(days))
+        items = items.filter(_day_range_filter(days, prefix='order__'))
+
+    order_rows = (
+        orders.annotate(day=TruncDate('created_at'))
+        .values('day', 'status')
+        .annotate(order_count=Count('order_id'), revenue=Sum('total_amount'))
+        .order_by()
+    )
+    item_rows = (
+        items.annotate(day=TruncDate('order__created_at'), status=F('order__status'))
+        .values('day', 'status')
+        .annotate(item_count=Sum('quantity'))
+        .order_by()
+    )
+    category_rows = (
+        items.annotate(
+            day=TruncDate('order__created_at'),
+            status=F('order__status'),
+            category=F('product__category'),
+        )
+        .values('day', 'status', 'category')
+        .annotate(
+            order_count=Count('order', distinct=True),
+            item_count=Sum('quantity'),
+            revenue=Sum(
+                F('price') * F('quantity'),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+        .order_by()
+    )
+
+    item_counts = {(row['day'], row['status']): row['item_count'] or 0 for row in item_rows}
+    rollups = [
+        DailySalesRollup(
+            date=row['day'],
+            status=row['status'],
+            category_id=None,
+            order_count=row['order_count'],
+            item_count=item_counts.get((row['day'], row['status']), 0),
+            revenue=row['revenue'] or 0,
+        )
+        for row in order_rows
+    ]
+    rollups.extend(
+        DailySalesRollup(
+            date=row['day'],
+            status=row['status'],
+            category_id=row['category'],
+            order_count=row['order_count'],
+            item_count=row['item_count'] or 0,
+            revenue=row['revenue'] or 0,
+        )
+        for row in category_rows
+    )
+    return rollups
+
+
+def refresh_days(days):
+    """Recompute the rollup rows for the given dates."""
+    days = set(days)
+    if not days:
+        return
+    with transaction.atomic():
+        DailySalesRollup.objects.filter(date__in=days).delete()
+        DailySalesRollup.objects.bulk_create(compute_rollups(days))
+
+
+def rebuild_all(batch_size=1000):
+    """Throw away the rollup table and rebuild it from every order."""
+    with transaction.atomic():
+        DailySalesRollup.objects.all().delete()
+        rollups = compute_rollups()
+        DailySalesRollup.objects.bulk_create(rollups, batch_size=batch_size)
+    # Bulk loads call this after bypassing the model signals, so none of the
+    # cached dashboard blocks can be trusted either.
+    dashboard_cache.invalidate_all()
+    return len(rollups)
+
+
+def schedule_refresh(created_at):
+    """Refresh the day containing ``created_at`` once the transaction commits."""
+    if created_at is None:
+        return
+    day = timezone.localdate(created_at) if timezone.is_aware(created_at) else created_at.date()
+    transaction.on_commit(lambda: refresh_days({day}))
@@ -0,0 +1,48 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import Customer
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+
+from .cache import invalidate_for_model
+from .rollups import schedule_refresh
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def refresh_rollup_for_order(sender, instance, **kwargs):
+    schedule_refresh(instance.created_at)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def refresh_rollup_for_order_item(sender, instance, **kwargs):
+    try:
+        order = instance.order
+    except Order.DoesNotExist:
+        # The parent order is being deleted; its own signal covers the day.
+        return
+    schedule_refresh(order.created_at)
+
+
+# Registered after the rollup receivers so the rollup refresh commits before
+# the cached blocks reading it are invalidated.
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_dashboard_cache(sender, **kwargs):
+    invalidate_for_model(sender._meta.label)
+
+
+@receiver(post_delete, sender=Product)
+def invalidate_inventory_snapshot(sender, **kwargs):
+    # The product's snapshot row is deleted with it (on_delete=CASCADE).
+    invalidate_for_model('dashboard.InventorySnapshot')
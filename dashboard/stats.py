@@ -0,0 +1,167 @@
+"""
+Reusable aggregate queries for the dashboard and analytics pages.
+
+``period_totals`` computes any number of aggregates over any number of date
+ranges in a single ``aggregate()`` call, each aggregate narrowed to its range
+with ``filter=`` (``SUM(...) FILTER (WHERE ...)``, or ``CASE`` on backends
+without ``FILTER``). ``bucket_series`` returns one row per hour, day, week or
+month of a range from a single ``GROUP BY`` on the truncated date, filling
+buckets without rows with zeroes, so its cost depends on the rows in the
+range, not on the number of buckets.
+
+Both work on any queryset and may follow relations (``order__created_at``):
+date fields are used directly, datetime fields are truncated in the current
+time zone.
+"""
+
+from datetime import date, timedelta, timezone as dt_timezone
+
+from django.db.models import DateField, DateTimeField, F, Q
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .rollups import day_start
+
+
+GRANULARITIES = ('hour', 'day', 'week', 'month')
+
+
+def _date_field(queryset, date_field):
+    opts = queryset.model._meta
+    for name in date_field.split('__'):
+        field = opts.get_field(name)
+        if field.is_relation:
+            opts = field.related_model._meta
+    return field
+
+
+def _range_filter(queryset, date_field, start, end):
+    """Match ``start <= date_field <= end`` (dates, both inclusive; either may be ``None``)."""
+    is_datetime = isinstance(_date_field(queryset, date_field), DateTimeField)
+    condition = Q()
+    if start is not None:
+        condition &= Q(**{f'{date_field}__gte': day_start(start) if is_datetime else start})
+    if end is not None:
+        if is_datetime:
+            condition &= Q(**{f'{date_field}__lt': day_start(end + timedelta(days=1))})
+        else:
+            condition &= Q(**{f'{date_field}__lte': end})
+    return condition
+
+
+def period_totals(queryset, periods, date_field='date', **aggregates):
+    """
+    Return ``{period: {name: value}}`` for ``periods`` (``{period: (start,
+    end)}``, inclusive dates, ``None`` for an open end) and ``aggregates``
+    (``name=Sum(...)``, which may carry their own ``filter``), from one
+    query. Empty aggregates are 0.
+    """
+    expressions = {}
+    for period, (start, end) in periods.items():
+        condition = _range_filter(queryset, date_field, start, end)
+        for name, aggregate in aggregates.items():
+            expression = aggregate.copy()
+            expression.filter = condition & expression.filter if expression.filter else condition
+            expressions[f'{period}__{name}'] = expression
+
+    values = queryset.aggregate(**expressions) if expressions else {}
+    return {
+        period: {name: values[f'{period}__{name}'] or 0 for name in aggregates}
+        for period in periods
+    }
+
+
+def _add_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def _first_bucket(start, granularity):
+    if granularity == 'hour':
+        return day_start(start)
+    if granularity == 'week':
+        return start - timedelta(days=start.weekday())
+    if granularity == 'month':
+        return start.replace(day=1)
+    return start
+
+
+def bucket_count(start, end, granularity):
+    """Number of ``granularity`` buckets touching ``start`` to ``end`` (inclusive dates)."""
+    days = (end - start).days + 1
+    if granularity == 'hour':
+        return days * 24
+    if granularity == 'week':
+        return (end - _first_bucket(start, 'week')).days // 7 + 1
+    if granularity == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return days
+
+
+def bucket_starts(start, end, granularity):
+    """
+    First instant (``hour``, an aware datetime when ``USE_TZ``) or first day
+    (``day``, ``week`` starting Monday, ``month``) of every bucket touching
+    ``start`` to ``end``. The first week and month may begin before ``start``.
+    """
+    bucket = _first_bucket(start, granularity)
+    if granularity == 'hour':
+        # Step in UTC so days with a DST change get 23 or 25 hours.
+        stop = day_start(end + timedelta(days=1))
+        if timezone.is_aware(bucket):
+            bucket, stop = bucket.astimezone(dt_timezone.utc), stop.astimezone(dt_timezone.utc)
+        hours = int((stop - bucket).total_seconds()) // 3600
+        buckets = [bucket + timedelta(hours=hour) for hour in range(hours)]
+        return [timezone.localtime(hour) for hour in buckets] if timezone.is_aware(bucket) else buckets
+    buckets = []
+    while bucket <= end:
+        buckets.append(bucket)
+        if granularity == 'month':
+            bucket = _add_month(bucket)
+        else:
+            bucket += timedelta(days=7 if granularity == 'week' else 1)
+    return buckets
+
+
+def _truncate(field, date_field, granularity):
+    if isinstance(field, DateTimeField):
+        if granularity == 'hour':
+            return Trunc(date_field, 'hour')
+        return Trunc(date_field, granularity, output_field=DateField())
+    if granularity == 'hour':
+        raise ValueError(f'{date_field} is a date field and cannot be bucketed by hour')
+    return F(date_field) if granularity == 'day' else Trunc(date_field, granularity)
+
+
+def bucket_series(queryset, start, end, granularity='day', date_field='date', **aggregates):
+    """
+    Return ``[{'bucket': start_of_bucket, name: value, ...}]`` for every
+    ``granularity`` bucket (see ``bucket_starts``) from ``start`` to ``end``
+    inclusive, from one grouped query; buckets without rows get 0. Only rows
+    within ``start`` to ``end`` are counted.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Unknown granularity {granularity!r}')
+    field = _date_field(queryset, date_field)
+    rows = {
+        row['bucket']: row
+        for row in queryset.filter(_range_filter(queryset, date_field, start, end))
+        .annotate(bucket=_truncate(field, date_field, granularity))
+        .values('bucket')
+        .annotate(**aggregates)
+        .order_by()
+    }
+    return [
+        {'bucket': bucket, **{name: rows.get(bucket, {}).get(name) or 0 for name in aggregates}}
+        for bucket in bucket_starts(start, end, granularity)
+    ]
+
+
+def daily_series(queryset, start, end, date_field='date', **aggregates):
+    """
+    Return ``[{'date': day, name: value, ...}]`` for every day from ``start``
+    to ``end`` inclusive, from one grouped query; days without rows get 0.
+    """
+    series = bucket_series(queryset, start, end, 'day', date_field, **aggregates)
+    for row in series:
+        row['date'] = row.pop('bucket')
+    return series
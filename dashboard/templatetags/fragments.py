@@ -0,0 +1,58 @@
+"""
+``{% fragment name "app_label.Model" ... [vary=value] %}...{% endfragment %}``
+
+Caches the rendered block in the dashboard cache under a key made of
+``name``, the version stamps of the listed models and ``vary`` (see
+``dashboard/cache.py``). Until one of those models is written to, the block
+is served from the cache without being rendered, so the lazy querysets it
+iterates never run; the view should pass them unevaluated.
+"""
+
+from django import template
+from django.conf import settings
+from django.template.base import token_kwargs
+
+from dashboard import cache as dashboard_cache
+
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, labels, vary):
+        self.nodelist = nodelist
+        self.name = name
+        self.labels = labels
+        self.vary = vary
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        labels = [label.resolve(context) for label in self.labels]
+        untracked = set(labels) - dashboard_cache.tracked_models()
+        if untracked:
+            raise template.TemplateSyntaxError(
+                f"Fragment {name!r} depends on {', '.join(sorted(untracked))}, whose writes are not tracked"
+            )
+        vary = '' if self.vary is None else str(self.vary.resolve(context))
+        key = dashboard_cache.fragment_key(name, labels, vary)
+        cache = dashboard_cache.get_cache()
+        html = cache.get(key)
+        if html is None:
+            html = self.nodelist.render(context)
+            timeout = getattr(settings, 'DASHBOARD_FRAGMENT_SECONDS', dashboard_cache.DEFAULT_FRAGMENT_SECONDS)
+            cache.set(key, html, timeout)
+        return html
+
+
+@register.tag
+def fragment(parser, token):
+    tag, *bits = token.split_contents()
+    vary = None
+    if bits and bits[-1].startswith('vary='):
+        vary = token_kwargs(bits[-1:], parser)['vary']
+        bits = bits[:-1]
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{tag}' takes a name, one or more model labels and an optional vary=")
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    return FragmentNode(nodelist, parser.compile_filter(bits[0]), [parser.compile_filter(bit) for bit in bits[1:]], vary)
@@ -6,4 +6,6 @@ app_name = 'dashboard'
 urlpatterns = [
     path('', views.dashboard_view, name='dashboard'),
     path('analytics/', views.analytics_view, name='analytics'),
+    path('analytics/data/', views.analytics_data_view, name='analytics_data'),
+    path('slow-requests/', views.slow_requests_view, name='slow_requests'),
 ]
\ No newline at end of file
@@ -1,145 +1,317 @@
-from django.shortcuts import render
+from datetime import timedelta
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.shortcuts import redirect, render
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Count, Sum
+from django.db.models import Avg, Count, DecimalField, F, Q, Sum
+from django.http import JsonResponse
 from django.utils import timezone
-from datetime import timedelta
-from products.models import Product, Category
-from orders.models import Order
+from products.models import LOW_STOCK_THRESHOLD, Product, Category
+from orders.models import Order, OrderItem
+from ecommerce.concurrency import gather
+from ecommerce.middleware import slow_requests
+from ecommerce.routers import use_replica
 
-@staff_member_required
-def dashboard_view(request):
-    """Main dashboard view with overview statistics"""
-    
-    # Basic statistics
-    total_products = Product.objects.count()
-    total_categories = Category.objects.count()
-    total_orders = Order.objects.count()
-    
-    # Recent orders (last 30 days)
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    recent_orders = Order.objects.filter(created_at__gte=thirty_days_ago).count()
-    
-    # Revenue calculations
-    total_revenue = Order.objects.filter(status='delivered').aggregate(
-        total=Sum('total_amount'))['total'] or 0
-    
-    monthly_revenue = Order.objects.filter(
-        status='delivered',
-        created_at__gte=thirty_days_ago
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-    
-    # Order status breakdown
-    order_status_stats = Order.objects.values('status').annotate(count=Count('status'))
-    
-    # Top selling products
-    top_products = Product.objects.annotate(
-        order_count=Count('orderitem')
-    ).order_by('-order_count')[:5]
-    
+from . import cache as dashboard_cache
+from . import rankings, stats
+from .forms import ALL_STATUSES, ANALYTICS_RANGES, AnalyticsFilterForm
+from .models import DailySalesRollup, InventorySnapshot
+
+def _catalog_counts():
+    return {
+        'total_products': Product.objects.count(),
+        'total_categories': Category.objects.count(),
+    }
+
+
+def _order_totals():
+    # Order and revenue figures come from the daily rollup rather than
+    # scanning every order on each page load.
+    thirty_days_ago = timezone.localdate() - timedelta(days=30)
+    totals = stats.period_totals(
+        DailySalesRollup.objects.filter(category__isnull=True),
+        {'all': (None, None), 'recent': (thirty_days_ago, None)},
+        orders=Sum('order_count'),
+        revenue=Sum('revenue', filter=Q(status='delivered')),
+    )
+    return {
+        'total_orders': totals['all']['orders'],
+        'recent_orders': totals['recent']['orders'],
+        'total_revenue': totals['all']['revenue'],
+        'monthly_revenue': totals['recent']['revenue'],
+    }
+
+
+def _order_status():
+    return list(
+        DailySalesRollup.objects.filter(category__isnull=True)
+        .values('status')
+        .annotate(count=Sum('order_count'))
+        .order_by('status')
+    )
+
+
+def _low_stock():
     # Low stock products (less than 10 items)
-    low_stock_products = Product.objects.filter(stock_quantity__lt=10)[:5]
-    
-    # Recent orders
-    recent_orders_list = Order.objects.select_related('customer').order_by('-created_at')[:5]
-    
+    return list(
+        Product.objects.select_related('category')
+        .filter(stock_quantity__lt=LOW_STOCK_THRESHOLD)
+        .order_by('stock_quantity')[:5]
+    )
+
+
+def _recent_orders():
+    return list(Order.objects.select_related('customer').order_by('-created_at')[:5])
+
+
+def async_staff_member_required(view):
+    """``staff_member_required`` for async views (Django 4.2's only wraps sync ones)."""
+    check = staff_member_required(lambda request, *args, **kwargs: None)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # Loads request.user on the request thread, where it stays cached
+        # for rendering.
+        denied = await sync_to_async(check)(request, *args, **kwargs)
+        if denied is not None:
+            return denied
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def _cached(block, compute):
+    return partial(dashboard_cache.get_or_compute, block, compute)
+
+
+async def _render(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+# Window of the dashboard's top products ranking.
+TOP_PRODUCTS_DAYS = 30
+
+
+# The dashboard and analytics pages are async: their independent blocks run
+# concurrently (see ecommerce/concurrency.py), so a page waits for its
+# slowest query instead of the sum of them. Blocks rendered inside cached
+# template fragments are passed as lazy querysets instead.
+@async_staff_member_required
+@use_replica
+async def dashboard_view(request):
+    """Main dashboard view with overview statistics"""
+    rank = request.GET.get('rank')
+    if rank not in rankings.METRICS:
+        rank = 'revenue'
+
+    # Each block is cached separately and invalidated by writes to the
+    # models it reads (see dashboard/cache.py).
+    catalog_counts, order_totals, order_status, top_products, low_stock, recent_orders = await gather(
+        _cached('catalog_counts', _catalog_counts),
+        _cached('order_totals', _order_totals),
+        _cached('order_status', _order_status),
+        partial(rankings.cached_top_products, rank, TOP_PRODUCTS_DAYS),
+        _cached('low_stock', _low_stock),
+        _cached('recent_orders', _recent_orders),
+    )
     context = {
-        'total_products': total_products,
-        'total_categories': total_categories,
-        'total_orders': total_orders,
-        'recent_orders': recent_orders,
-        'total_revenue': total_revenue,
-        'monthly_revenue': monthly_revenue,
-        'order_status_stats': order_status_stats,
+        **catalog_counts,
+        **order_totals,
+        'order_status_stats': order_status,
         'top_products': top_products,
-        'low_stock_products': low_stock_products,
-        'recent_orders_list': recent_orders_list,
+        'top_products_rank': rank,
+        'top_products_ranks': rankings.METRICS,
+        'top_products_days': TOP_PRODUCTS_DAYS,
+        'low_stock_products': low_stock,
+        'recent_orders_list': recent_orders,
     }
-    
-    return render(request, 'dashboard/dashboard.html', context)
 
-@staff_member_required
-def analytics_view(request):
-    """Analytics dashboard with charts and detailed metrics"""
-    
-    # Sales analytics for the last 7 days
-    days_data = []
-    for i in range(7):
-        date = timezone.now().date() - timedelta(days=i)
-        day_orders = Order.objects.filter(
-            created_at__date=date,
-            status='delivered'
-        ).aggregate(
-            count=Count('order_id'),
-            revenue=Sum('total_amount')
-        )
-        days_data.append({
-            'date': date.strftime('%Y-%m-%d'),
-            'orders': day_orders['count'] or 0,
-            'revenue': float(day_orders['revenue'] or 0)
-        })
-    
-    days_data.reverse()  # Show oldest to newest
-    
-    # Category performance
-    category_stats = Category.objects.annotate(
-        product_count=Count('products'),
+    return await _render(request, 'dashboard/dashboard.html', context)
+
+
+# strftime formats for the bucket labels of each granularity.
+BUCKET_LABELS = {'hour': '%Y-%m-%d %H:00', 'day': '%Y-%m-%d', 'week': '%Y-%m-%d', 'month': '%Y-%m'}
+
+
+def _order_rollups():
+    return DailySalesRollup.objects.filter(category__isnull=True, status='delivered')
+
+
+def _sales_series(filters):
+    """
+    Orders and revenue per bucket for the cleaned ``AnalyticsFilterForm``
+    data. Days, weeks and months are bucketed from the daily rollup, so a
+    range over years of orders is still one grouped query over at most a row
+    per day and status. Hours need the order tables (the rollup is daily);
+    ``MAX_BUCKETS`` keeps those ranges to about two weeks.
+    """
+    category = filters['category']
+    if filters['granularity'] != 'hour':
+        queryset = DailySalesRollup.objects.filter(category=category)
+        date_field, status_field = 'date', 'status'
+        aggregates = {'orders': Sum('order_count'), 'revenue': Sum('revenue')}
+    elif category is None:
+        queryset = Order.objects.all()
+        date_field, status_field = 'created_at', 'status'
+        aggregates = {'orders': Count('pk'), 'revenue': Sum('total_amount')}
+    else:
+        # Line-item totals, like the rollup's category rows.
+        queryset = OrderItem.objects.filter(product__category=category)
+        date_field, status_field = 'order__created_at', 'order__status'
+        aggregates = {
+            'orders': Count('order', distinct=True),
+            'revenue': Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+        }
+    if filters['status'] != ALL_STATUSES:
+        queryset = queryset.filter(**{status_field: filters['status']})
+    return stats.bucket_series(
+        queryset, filters['start'], filters['end'], filters['granularity'], date_field, **aggregates
+    )
+
+
+def _series_payload(filters, series):
+    """The sales series as served to the analytics charts."""
+    label = BUCKET_LABELS[filters['granularity']]
+    return {
+        'start': filters['start'].isoformat(),
+        'end': filters['end'].isoformat(),
+        'granularity': filters['granularity'],
+        'status': filters['status'],
+        'category': filters['category'].pk if filters['category'] else None,
+        'buckets': [
+            {
+                'bucket': row['bucket'].isoformat(),
+                'label': row['bucket'].strftime(label),
+                'orders': row['orders'],
+                'revenue': float(row['revenue']),
+            }
+            for row in series
+        ],
+        'totals': {
+            'orders': sum(row['orders'] for row in series),
+            'revenue': float(sum(row['revenue'] for row in series)),
+        },
+    }
+
+
+def _filter_form(data):
+    form = AnalyticsFilterForm(data)
+    # Validates here, on a worker thread, as a category lookup hits the database.
+    form.is_valid()
+    return form
+
+
+def _category_stats():
+    return Category.objects.annotate(
         total_sold=Count('products__orderitem')
     ).order_by('-total_sold')
+
+
+def _monthly_totals(current_month, last_month):
+    return stats.period_totals(
+        _order_rollups().filter(date__gte=last_month),
+        {'current': (current_month, None), 'last': (last_month, current_month - timedelta(days=1))},
+        orders=Sum('order_count'),
+        revenue=Sum('revenue'),
+    )
+
+
+@async_staff_member_required
+@use_replica
+async def analytics_view(request):
+    """Analytics dashboard with charts and detailed metrics"""
     
+    today = timezone.localdate()
+    # Sales trend for the filters in the query string (the last 7 days of
+    # delivered orders by default)
+    form = await sync_to_async(_filter_form)(request.GET)
     # Monthly comparison
-    current_month = timezone.now().replace(day=1)
+    current_month = today.replace(day=1)
     last_month = (current_month - timedelta(days=1)).replace(day=1)
-    
-    current_month_stats = Order.objects.filter(
-        created_at__gte=current_month,
-        status='delivered'
-    ).aggregate(
-        orders=Count('order_id'),
-        revenue=Sum('total_amount')
-    )
-    
-    last_month_stats = Order.objects.filter(
-        created_at__gte=last_month,
-        created_at__lt=current_month,
-        status='delivered'
-    ).aggregate(
-        orders=Count('order_id'),
-        revenue=Sum('total_amount')
-    )
-    
+
+    blocks = [partial(_monthly_totals, current_month, last_month)]
+    if form.is_valid():
+        blocks.append(partial(_sales_series, form.cleaned_data))
+    monthly, *series = await gather(*blocks)
+
     context = {
-        'days_data': days_data,
-        'category_stats': category_stats,
-        'current_month_stats': current_month_stats,
-        'last_month_stats': last_month_stats,
+        'form': form,
+        'days': form.cleaned_data['days'] if form.is_valid() else None,
+        'ranges': ANALYTICS_RANGES,
+        'series': _series_payload(form.cleaned_data, series[0]) if series else None,
+        # Lazy: only evaluated when its template fragments are not cached.
+        'category_stats': _category_stats(),
+        'current_month_stats': monthly['current'],
+        'last_month_stats': monthly['last'],
     }
     
-    return render(request, 'dashboard/analytics.html', context)
+    return await _render(request, 'dashboard/analytics.html', context)
+
+
+@async_staff_member_required
+@use_replica
+async def analytics_data_view(request):
+    """The analytics sales series as JSON, for the chart's filter controls"""
+    form = await sync_to_async(_filter_form)(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+    (series,) = await gather(partial(_sales_series, form.cleaned_data))
+    return JsonResponse(_series_payload(form.cleaned_data, series))
+
 
 @staff_member_required
+@use_replica
 def inventory_view(request):
     """Inventory management dashboard"""
     
+    # Everything comes from the inventory snapshot (see dashboard/inventory.py),
+    # and every block is a cached template fragment (see
+    # templatetags/fragments.py), so these querysets stay lazy and only run
+    # when the snapshot has been refreshed since their fragment was rendered.
+    # With nothing to run concurrently the view is synchronous.
+    snapshots = InventorySnapshot.objects.all()
+
     # Stock levels
-    products = Product.objects.select_related('category').order_by('stock_quantity')
+    products = snapshots.order_by('stock_quantity', 'product_id')
     
     # Stock alerts
-    out_of_stock = Product.objects.filter(stock_quantity=0)
-    low_stock = Product.objects.filter(stock_quantity__gt=0, stock_quantity__lt=10)
+    below_threshold = snapshots.filter(stock_quantity__lt=LOW_STOCK_THRESHOLD).order_by('stock_quantity', 'product_id')
+    out_of_stock = below_threshold.filter(stock_quantity=0)
+    low_stock = below_threshold.filter(stock_quantity__gt=0)
+
+    # Reorder suggestions, the products that run out soonest first
+    reorder = snapshots.filter(reorder_quantity__gt=0).order_by('days_of_cover', 'product_id')
     
     # Category breakdown
-    category_inventory = Category.objects.annotate(
-        total_products=Count('products'),
-        total_stock=Sum('products__stock_quantity'),
-        avg_price=Sum('products__price') / Count('products')
-    )
+    category_inventory = snapshots.values('category_id', 'category_name').annotate(
+        product_count=Count('pk'),
+        total_stock=Sum('stock_quantity'),
+        avg_price=Avg('price'),
+    ).order_by('category_name')
     
     context = {
         'products': products,
         'out_of_stock': out_of_stock,
         'low_stock': low_stock,
+        'reorder': reorder,
         'category_inventory': category_inventory,
+        'latest_snapshot': snapshots.order_by('-refreshed_at')[:1],
+        'velocity_days': settings.INVENTORY_VELOCITY_DAYS,
     }
     
-    return render(request, 'dashboard/inventory.html', context)
\ No newline at end of file
+    return render(request, 'dashboard/inventory.html', context)
+
+@staff_member_required
+def slow_requests_view(request):
+    """Recently sampled slow requests, newest first"""
+    if request.method == 'POST':
+        slow_requests.clear()
+        return redirect('dashboard:slow_requests')
+
+    context = {
+        'entries': slow_requests.entries(),
+        'slow_ms': settings.REQUEST_METRICS_SLOW_MS,
+    }
+    return render(request, 'dashboard/slow_requests.html', context)
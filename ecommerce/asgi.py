@@ -8,8 +8,14 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
 import os
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce.settings')
 
-application = get_asgi_application()
\ No newline at end of file
+application = get_asgi_application()
+
+if settings.TEMPLATE_CACHING:
+    from ecommerce.templating import warm_templates
+
+    warm_templates()
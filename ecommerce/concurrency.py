@@ -0,0 +1,62 @@
+"""
+Running independent blocks of ORM work concurrently from async views.
+
+Django's async ORM methods (``acount``, ``aaggregate``, ...) all go through
+``sync_to_async(thread_sensitive=True)``, i.e. through one shared thread, so
+awaiting several of them together still runs their queries one after
+another. :func:`gather` runs each block in its own worker thread instead,
+with that thread's own database connection, so a page waits for its slowest
+block rather than for the sum of them.
+
+Worker connections stay open between requests and are recycled like request
+connections: ``close_old_connections`` runs before and after every block,
+honouring ``CONN_MAX_AGE`` and the connection health checks. Queries are
+counted in the current request's metrics (see ``ecommerce/middleware.py``),
+and the replica routing of the calling view carries over (see
+``ecommerce/routers.py``) because worker threads inherit the caller's context.
+
+The blocks run one after another on the request thread when
+``ASYNC_CONCURRENT_QUERIES`` is off, or when the database is an in-memory
+SQLite database (as in tests), which other threads cannot see.
+"""
+
+import asyncio
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+
+from .middleware import current_metrics
+
+
+def concurrency_enabled():
+    if not getattr(settings, 'ASYNC_CONCURRENT_QUERIES', True):
+        return False
+    connection = connections[DEFAULT_DB_ALIAS]
+    return not (connection.vendor == 'sqlite' and connection.is_in_memory_db())
+
+
+def _in_worker(function, metrics):
+    def run():
+        close_old_connections()
+        try:
+            with ExitStack() as stack:
+                if metrics is not None:
+                    for connection in connections.all():
+                        stack.enter_context(connection.execute_wrapper(metrics))
+                return function()
+        finally:
+            close_old_connections()
+    return run
+
+
+async def gather(*functions):
+    """Call the synchronous ``functions`` concurrently; return their results in order."""
+    if not concurrency_enabled():
+        return [await sync_to_async(function)() for function in functions]
+    metrics = current_metrics()
+    return await asyncio.gather(*(
+        sync_to_async(_in_worker(function, metrics), thread_sensitive=False)()
+        for function in functions
+    ))
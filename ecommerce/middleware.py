@@ -0,0 +1,298 @@
+"""
+Per-request SQL and timing instrumentation.
+
+``RequestMetricsMiddleware`` wraps every database connection with
+``execute_wrapper`` for the duration of a request and records:
+
+* the number of queries and the time spent executing them,
+* repeated identical SQL statements (the signature of an N+1 loop),
+* the time spent rendering templates.
+
+The numbers are logged as one JSON line on the ``ecommerce.requests``
+logger, and requests slower than ``REQUEST_METRICS_SLOW_MS`` are kept in a
+small in-memory ring buffer that staff can browse at
+``/dashboard/slow-requests/``. Staff users also get them in a
+``Server-Timing`` header (visible in the browser's network panel); set
+``REQUEST_METRICS_PUBLIC_TIMING`` to send it to every client.
+
+Streaming responses (the CSV exports) produce their body after the view has
+returned, so they are measured until the stream is exhausted or closed and
+reported then, without a ``Server-Timing`` header (the headers have been
+sent by that time).
+
+The middleware runs natively under both WSGI and ASGI, so async views
+(the dashboard pages) are not moved to a thread for it. Under ASGI the
+queries counted are those of the request's ``sync_to_async`` thread, where
+Django runs sync views and the async ORM methods, and of the blocks run by
+``ecommerce.concurrency.gather``.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template as DjangoBackendTemplate
+from django.utils import timezone
+
+
+logger = logging.getLogger('ecommerce.requests')
+
+DEFAULT_SLOW_MS = 500
+DEFAULT_BUFFER_SIZE = 50
+DEFAULT_DUPLICATE_THRESHOLD = 3
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Counters collected while a single request is processed."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.statements = Counter()
+        self._render_depth = 0
+        # Blocks run concurrently by ecommerce.concurrency record from
+        # several threads.
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        # Signature of django.db.backends.utils.CursorWrapper execute wrappers.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.query_count += 1
+                self.db_seconds += elapsed
+                self.statements[sql] += 1
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    @property
+    def db_ms(self):
+        return self.db_seconds * 1000
+
+    @property
+    def template_ms(self):
+        return self.template_seconds * 1000
+
+    def duplicates(self, threshold):
+        """Return ``[(sql, count), ...]`` for statements run ``threshold``+ times."""
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+
+def current_metrics():
+    """The :class:`RequestMetrics` of the request being handled, if any."""
+    return _current_metrics.get()
+
+
+def _timed_template_render(render):
+    def wrapper(template, context=None, request=None):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return render(template, context, request)
+        # Only time the outermost render so included templates are not
+        # counted twice.
+        metrics._render_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(template, context, request)
+        finally:
+            metrics._render_depth -= 1
+            if metrics._render_depth == 0:
+                metrics.template_seconds += time.perf_counter() - started
+
+    wrapper._request_metrics_wrapped = True
+    return wrapper
+
+
+def _install_template_timer():
+    if not getattr(DjangoBackendTemplate.render, '_request_metrics_wrapped', False):
+        DjangoBackendTemplate.render = _timed_template_render(DjangoBackendTemplate.render)
+
+
+class SlowRequestLog:
+    """Thread-safe ring buffer of the most recent slow requests."""
+
+    def __init__(self, size):
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self):
+        """Newest first."""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def resize(self, size):
+        with self._lock:
+            self._entries = deque(self._entries, maxlen=size)
+
+    @property
+    def size(self):
+        return self._entries.maxlen
+
+
+slow_requests = SlowRequestLog(DEFAULT_BUFFER_SIZE)
+
+
+def _wrap_connections(metrics):
+    """Count the queries run on this thread's connections into ``metrics`` until the returned stack is closed."""
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(metrics))
+    return stack
+
+
+@contextmanager
+def _collecting(metrics):
+    """Count the queries run on this thread's connections into ``metrics``."""
+    token = _current_metrics.set(metrics)
+    try:
+        with _wrap_connections(metrics):
+            yield
+    finally:
+        _current_metrics.reset(token)
+
+
+def _shows_timing(request):
+    if getattr(settings, 'REQUEST_METRICS_PUBLIC_TIMING', False):
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        _install_template_timer()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        with _collecting(metrics):
+            response = self.get_response(request)
+
+        if response.streaming:
+            self._measure_stream(request, response, metrics)
+        else:
+            self._report(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            # Database connections are per thread, and the request's ORM
+            # calls run in its thread-sensitive sync_to_async thread.
+            wrappers = await sync_to_async(_wrap_connections)(metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(wrappers.close)()
+        finally:
+            _current_metrics.reset(token)
+
+        if response.streaming:
+            self._measure_stream(request, response, metrics)
+        else:
+            # request.user may still have to be loaded from the database.
+            await sync_to_async(self._report)(request, response, metrics)
+        return response
+
+    def _measure_stream(self, request, response, metrics):
+        content = response.streaming_content
+        if response.is_async:
+            response.streaming_content = self._iterate_async(request, response, metrics, content)
+        else:
+            response.streaming_content = self._iterate(request, response, metrics, content)
+
+    def _iterate(self, request, response, metrics, content):
+        try:
+            while True:
+                with _collecting(metrics):
+                    chunk = next(content, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            self._report(request, response, metrics)
+
+    async def _iterate_async(self, request, response, metrics, content):
+        wrappers = await sync_to_async(_wrap_connections)(metrics)
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            await sync_to_async(wrappers.close)()
+            await sync_to_async(self._report)(request, response, metrics)
+
+    def _report(self, request, response, metrics):
+        total_ms = metrics.total_ms
+        threshold = getattr(settings, 'REQUEST_METRICS_DUPLICATE_THRESHOLD', DEFAULT_DUPLICATE_THRESHOLD)
+        duplicates = metrics.duplicates(threshold)
+
+        if not response.streaming and _shows_timing(request):
+            timings = [
+                f'db;dur={metrics.db_ms:.1f};desc="{metrics.query_count} queries"',
+                f'tpl;dur={metrics.template_ms:.1f};desc="templates"',
+                f'total;dur={total_ms:.1f}',
+            ]
+            if duplicates:
+                timings.append(f'dup;desc="{len(duplicates)} repeated statements"')
+            response['Server-Timing'] = ', '.join(timings)
+
+        slow_ms = getattr(settings, 'REQUEST_METRICS_SLOW_MS', DEFAULT_SLOW_MS)
+        is_slow = slow_ms is not None and total_ms >= slow_ms
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'streaming': response.streaming,
+            'total_ms': round(total_ms, 1),
+            'db_ms': round(metrics.db_ms, 1),
+            'template_ms': round(metrics.template_ms, 1),
+            'queries': metrics.query_count,
+            'duplicate_queries': [
+                {'sql': sql[:500], 'count': count} for sql, count in duplicates
+            ],
+        }
+        logger.log(logging.WARNING if is_slow else logging.INFO, json.dumps(record))
+
+        buffer_size = getattr(settings, 'REQUEST_METRICS_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)
+        if is_slow and buffer_size:
+            if slow_requests.size != buffer_size:
+                slow_requests.resize(buffer_size)
+            user = getattr(request, 'user', None)
+            slow_requests.add({
+                **record,
+                'timestamp': timezone.now(),
+                'user': user.get_username() if user is not None and user.is_authenticated else '',
+            })
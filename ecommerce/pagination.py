@@ -0,0 +1,212 @@
+"""
+Keyset (cursor) pagination shared by the admin list views.
+
+Pages are selected by seeking past the last row of the previous page on a
+stable, unique ordering such as ``(-created_at, -order_id)`` instead of using
+OFFSET, so the cost of a page does not grow with how deep the user pages.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 25
+DEFAULT_MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor string cannot be decoded for a paginator."""
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder rounds datetimes to milliseconds, which would make the
+    # seek skip or repeat rows that share the same millisecond.
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CursorPage:
+    """A single page of results plus the cursors needed to move around."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.page_size = page_size
+        self.next_url = None
+        self.previous_url = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class CursorPaginator:
+    """
+    Paginate a queryset by seeking on ``ordering``.
+
+    ``ordering`` must be a sequence of model field names (optionally prefixed
+    with ``-``) whose combination is unique, e.g. ``('-created_at', '-pk')``.
+    The last field should always be the primary key so ties are broken.
+    """
+
+    def __init__(self, queryset, ordering, page_size=DEFAULT_PAGE_SIZE):
+        if not ordering:
+            raise ValueError('CursorPaginator requires at least one ordering field.')
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+        self.model = queryset.model
+
+    # Cursor encoding -----------------------------------------------------
+
+    def _field_names(self):
+        return [name.lstrip('-') for name in self.ordering]
+
+    def _position(self, obj):
+        position = []
+        for name in self._field_names():
+            value = getattr(obj, 'pk' if name == 'pk' else name)
+            position.append(value)
+        return position
+
+    def encode_cursor(self, obj, direction):
+        payload = {'d': direction, 'p': self._position(obj)}
+        raw = json.dumps(payload, cls=_CursorEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            direction = payload['d']
+            raw_position = payload['p']
+        except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError) as exc:
+            raise InvalidCursor(str(exc)) from exc
+
+        names = self._field_names()
+        if direction not in ('n', 'p') or not isinstance(raw_position, list) or len(raw_position) != len(names):
+            raise InvalidCursor('Cursor does not match this ordering.')
+
+        position = []
+        for name, value in zip(names, raw_position):
+            try:
+                field = self.model._meta.pk if name == 'pk' else self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                # Annotations (e.g. a search rank) are plain JSON numbers.
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise InvalidCursor(f'Invalid value for {name}.')
+                position.append(value)
+                continue
+            try:
+                position.append(field.to_python(value))
+            except Exception as exc:
+                raise InvalidCursor(str(exc)) from exc
+        return direction, position
+
+    # Seeking ---------------------------------------------------------------
+
+    def _seek_filter(self, position, reverse):
+        """
+        Build ``(a > x) OR (a = x AND b > y) OR ...`` for the ordering,
+        flipping each comparison for descending fields (and again when
+        walking backwards).
+        """
+        condition = Q()
+        equal_prefix = {}
+        for name, value in zip(self.ordering, position):
+            descending = name.startswith('-')
+            field = name.lstrip('-')
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= Q(**equal_prefix, **{f'{field}__{lookup}': value})
+            equal_prefix[field] = value
+        return condition
+
+    def _reversed_ordering(self):
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering)
+
+    def page(self, cursor=None):
+        """Return the :class:`CursorPage` addressed by ``cursor``."""
+        direction, position = 'n', None
+        if cursor:
+            direction, position = self.decode_cursor(cursor)
+        backwards = direction == 'p'
+
+        queryset = self.queryset.order_by(*(self._reversed_ordering() if backwards else self.ordering))
+        if position is not None:
+            queryset = queryset.filter(self._seek_filter(position, reverse=backwards))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = self.encode_cursor(rows[-1], 'n')
+            if (has_more and backwards) or (position is not None and not backwards):
+                previous_cursor = self.encode_cursor(rows[0], 'p')
+        return CursorPage(rows, next_cursor, previous_cursor, self.page_size)
+
+
+def get_page_size(request, default=None):
+    """Read ``?page_size=`` from the request, clamped to the configured maximum."""
+    default = default or getattr(settings, 'PAGINATION_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    maximum = getattr(settings, 'PAGINATION_MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)
+    try:
+        page_size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(page_size, maximum))
+
+
+def paginate(request, queryset, ordering, page_size=None):
+    """
+    Paginate ``queryset`` for a list view, reading ``?cursor=`` and
+    ``?page_size=`` from the request. An unreadable cursor falls back to the
+    first page rather than raising.
+    """
+    paginator = CursorPaginator(queryset, ordering, page_size or get_page_size(request))
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        page = paginator.page(None)
+
+    # Carry the current filters (status, search, product, page_size) over to
+    # the neighbouring pages.
+    if page.next_cursor:
+        page.next_url = _url_with_cursor(request, page.next_cursor)
+    if page.previous_cursor:
+        page.previous_url = _url_with_cursor(request, page.previous_cursor)
+    return page
+
+
+def _url_with_cursor(request, cursor):
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f'?{params.urlencode()}'
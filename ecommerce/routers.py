@@ -0,0 +1,118 @@
+"""
+Primary / read-replica routing.
+
+Writes always go to ``default`` (the primary). Reads go to the ``replica``
+alias only while a view decorated with :func:`use_replica` is running, so
+the read-heavy pages (dashboards, lists) are opted in one by one and
+everything else, including forms that read what they just wrote, stays on
+the primary. Inside such a view reads still go to the primary when:
+
+* no ``replica`` database is configured,
+* the request is not a GET or HEAD,
+* a transaction is open on the primary (reads inside it must see its writes),
+* the client wrote something in the last ``DATABASE_REPLICA_PIN_SECONDS``
+  (``PrimaryPinMiddleware`` sets a short-lived cookie after each write), so
+  the page you are redirected to after saving is not served from a replica
+  that has not caught up yet.
+
+Cached blocks computed on the replica (see ``dashboard/cache.py``) may lag
+the primary by the replication delay until they are next recomputed.
+"""
+
+import asyncio
+import functools
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+REPLICA = 'replica'
+PIN_COOKIE = 'db_primary_pin'
+DEFAULT_PIN_SECONDS = 10
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def _wants_replica(request):
+    return (
+        replica_configured()
+        and request.method in ('GET', 'HEAD')
+        and PIN_COOKIE not in request.COOKIES
+    )
+
+
+def use_replica(view):
+    """Serve the reads of ``view`` from the replica (see the module docstring)."""
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            token = _replica_reads.set(_wants_replica(request))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            token = _replica_reads.set(_wants_replica(request))
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is populated by replication, never migrated directly.
+        return db == DEFAULT_DB_ALIAS
+
+
+class PrimaryPinMiddleware:
+    """Pin a client's reads to the primary for a few seconds after it writes."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._pin(request, await self.get_response(request))
+
+    def _pin(self, request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE') and replica_configured():
+            response.set_cookie(
+                PIN_COOKIE,
+                '1',
+                max_age=getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,157 @@
+"""
+Production static files.
+
+With ``STATIC_PRODUCTION`` enabled, ``collectstatic`` stores files through
+:class:`CompressedManifestStaticFilesStorage`: every file is copied under a
+content-hashed name (``css/styles.3f2a9c1b7e4d.css``, and ``{% static %}``
+links to it) and text files also get precompressed ``.gz`` variants, and
+``.br`` ones when the optional ``brotli`` package is installed.
+
+:class:`StaticFileServer` wraps the WSGI application (see ``wsgi.py``) and
+serves ``STATIC_ROOT`` before a request reaches Django: it picks the smallest
+variant the client accepts and marks hashed files as immutable for a year,
+since any change to them changes their URL. Unhashed names are revalidated
+after ``STATIC_MAX_AGE`` seconds.
+"""
+
+import gzip
+import json
+import mimetypes
+import os
+from wsgiref.util import FileWrapper
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.utils.http import parse_etags
+
+try:
+    import brotli
+except ImportError:  # Optional; only gzip variants are written without it.
+    brotli = None
+
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ico'}
+# Variants that do not save at least this fraction of the size are dropped.
+MIN_SAVING = 0.05
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+DEFAULT_MAX_AGE = 60
+
+# (Content-Encoding, file suffix), preferred first.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _compressors():
+    compressors = {}
+    if brotli is not None:
+        compressors['.br'] = lambda data: brotli.compress(data, quality=11)
+    # mtime=0 keeps the output identical across runs.
+    compressors['.gz'] = lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    return compressors
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest (hashed names) storage that also writes compressed variants."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS and self.exists(name):
+                self._compress(name)
+
+    def _compress(self, name):
+        with self.open(name) as handle:
+            data = handle.read()
+        for suffix, compress in _compressors().items():
+            compressed = compress(data)
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            if len(compressed) <= len(data) * (1 - MIN_SAVING):
+                self._save(name + suffix, ContentFile(compressed))
+
+
+class StaticFile:
+    def __init__(self, path, immutable, max_age):
+        stat = os.stat(path)
+        content_type, _ = mimetypes.guess_type(path)
+        self.path = path
+        self.size = stat.st_size
+        # Each encoding is a different representation, so each gets its own
+        # strong ETag (a cache must not answer a gzip request with br bytes).
+        version = f'{stat.st_size:x}-{int(stat.st_mtime):x}'
+        self.etag = f'"{version}"'
+        self.headers = [
+            ('Content-Type', content_type or 'application/octet-stream'),
+            ('Cache-Control', f'public, max-age={IMMUTABLE_MAX_AGE}, immutable' if immutable else f'public, max-age={max_age}'),
+        ]
+        self.variants = [
+            (encoding, path + suffix, os.path.getsize(path + suffix), f'"{version}-{encoding}"')
+            for encoding, suffix in ENCODINGS
+            if os.path.exists(path + suffix)
+        ]
+        if self.variants:
+            self.headers.append(('Vary', 'Accept-Encoding'))
+
+    def choose(self, accept_encoding):
+        """``(path, size, encoding, etag)`` of the best variant for an ``Accept-Encoding`` header."""
+        accepted = set()
+        for token in accept_encoding.split(','):
+            coding, _, params = token.strip().partition(';')
+            if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                accepted.add(coding.strip().lower())
+        for encoding, path, size, etag in self.variants:
+            if encoding in accepted:
+                return path, size, encoding, etag
+        return self.path, self.size, None, self.etag
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an ``If-None-Match`` header matches ``etag``, using the weak comparison it calls for."""
+    etags = parse_etags(if_none_match)
+    return '*' in etags or any(tag.removeprefix('W/') == etag for tag in etags)
+
+
+class StaticFileServer:
+    """WSGI middleware serving the collected files in ``root`` at ``prefix``."""
+
+    def __init__(self, application, root, prefix, max_age=DEFAULT_MAX_AGE):
+        self.application = application
+        self.prefix = '/' + prefix.strip('/') + '/'
+        self.files = self._scan(root, max_age)
+
+    def _scan(self, root, max_age):
+        manifest_path = os.path.join(root, ManifestStaticFilesStorage.manifest_name)
+        hashed = set()
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as handle:
+                hashed = set(json.load(handle).get('paths', {}).values())
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        files = {}
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(suffixes):
+                    continue
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                files[self.prefix + name] = StaticFile(path, name in hashed, max_age)
+        return files
+
+    def __call__(self, environ, start_response):
+        static = self.files.get(environ.get('PATH_INFO', ''))
+        if static is None or environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            return self.application(environ, start_response)
+
+        path, size, encoding, etag = static.choose(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if etag_matches(environ.get('HTTP_IF_NONE_MATCH', ''), etag):
+            start_response('304 Not Modified', static.headers + [('ETag', etag)])
+            return []
+        headers = static.headers + [('ETag', etag), ('Content-Length', str(size))]
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(open(path, 'rb'), 64 * 1024)
@@ -0,0 +1,55 @@
+"""
+Production template loading.
+
+With ``TEMPLATE_CACHING`` enabled the settings configure the cached template
+loader explicitly (in front of the filesystem and app directories loaders),
+and ``wsgi.py`` / ``asgi.py`` call :func:`warm_templates` when a worker
+boots. Warming parses every template under the project's template
+directories into the cache once, so no request pays for reading and
+compiling ``base.html`` and its page templates, including the first one a
+worker serves. Templates are not re-read afterwards: restart the workers to
+pick up template changes.
+
+``dashboard.benchmark.time_template_renders`` (the ``benchmark_templates``
+command) measures the difference.
+"""
+
+import logging
+import os
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(directories):
+    """Names (relative paths) of the template files under ``directories``."""
+    names = []
+    for directory in directories:
+        for root, dirnames, filenames in os.walk(directory):
+            dirnames[:] = [name for name in dirnames if not name.startswith('.')]
+            for filename in filenames:
+                if not filename.startswith('.'):
+                    path = os.path.join(root, filename)
+                    names.append(os.path.relpath(path, directory).replace(os.sep, '/'))
+    return sorted(set(names))
+
+
+def warm_templates(engine=None):
+    """
+    Load every template under ``engine``'s ``DIRS`` (the project's
+    ``templates/``) through its loaders, so a cached loader holds them
+    compiled. Returns the number loaded; templates that fail to compile are
+    logged and skipped, and raise again when a request renders them.
+    """
+    engine = engine or engines['django'].engine
+    loaded = 0
+    for name in template_names(engine.dirs):
+        try:
+            engine.get_template(name)
+        except (TemplateDoesNotExist, TemplateSyntaxError) as e:
+            logger.warning('Could not preload template %s: %s', name, e)
+        else:
+            loaded += 1
+    return loaded
@@ -16,7 +16,8 @@ urlpatterns = [
     path('accounts/', include('accounts.urls')),
     path('products/', include('products.urls')),
     path('orders/', include('orders.urls')),
-    path('payments/', include('payments.urls'))
+    path('payments/', include('payments.urls')),
+    path('api/v1/', include('api.urls')),
 ]
 
 # Serve media files
@@ -8,8 +8,20 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 """
 
 import os
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+if settings.TEMPLATE_CACHING:
+    from ecommerce.templating import warm_templates
+
+    warm_templates()
+
+if settings.STATIC_PRODUCTION:
+    # Serve collected static files without going through Django.
+    from ecommerce.staticfiles import StaticFileServer
+
+    application = StaticFileServer(application, settings.STATIC_ROOT, settings.STATIC_URL, settings.STATIC_MAX_AGE)
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, router, transaction
 from accounts.models import Customer
 from products.models import Product
 
@@ -27,9 +27,30 @@ class Order(models.Model):
     def __str__(self):
         return f"Order #{self.order_id} - {self.customer.username}"
 
+    def save(self, *args, **kwargs):
+        # The customer counters move in a post_save receiver (see
+        # accounts.signals); keep them in the transaction that writes the row.
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so the customer counters can apply the difference on save.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     class Meta:
         verbose_name = "Order"
         verbose_name_plural = "Orders"
+        indexes = [
+            # Order list (keyset pages on -created_at, -order_id), dashboard
+            # recent orders and the rollup's per-day range scans.
+            models.Index(fields=['-created_at', '-order_id'], name='order_created_idx'),
+            # The same list filtered by status.
+            models.Index(fields=['status', '-created_at', '-order_id'], name='order_status_created_idx'),
+        ]
 
 
 class OrderItem(models.Model):
@@ -0,0 +1,161 @@
+"""
+Stock reservation for orders.
+
+Stock is moved with conditional ``UPDATE ... SET stock_quantity =
+stock_quantity - n WHERE stock_quantity >= n`` statements inside the order's
+transaction, so two concurrent orders can never both take the last units:
+whichever updates second sees the reduced quantity and matches no row.
+
+Products are always updated in ascending primary key order. Each UPDATE
+locks its row until commit, so two orders sharing products take those locks
+in the same order and cannot deadlock. (SQLite locks the whole database on
+the first write instead, which serialises orders just the same.)
+
+Queryset updates send no signals, so the categories' denormalised
+``total_stock`` is moved here too, after the products and again in ascending
+primary key order.
+"""
+
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+
+from products.counters import adjust_category
+from products.models import Product
+
+from .models import Order, OrderItem
+
+
+CANCELLED = 'cancelled'
+
+
+class InsufficientStock(Exception):
+    """Raised when an order asks for more units than are in stock."""
+
+    def __init__(self, shortages):
+        # {product_id: (requested, available)}
+        self.shortages = shortages
+        super().__init__(
+            'Insufficient stock for product(s) '
+            + ', '.join(f'#{pk} ({requested} requested, {available} available)'
+                        for pk, (requested, available) in sorted(shortages.items()))
+        )
+
+
+def _quantities(lines):
+    """Sum ``(product_id, quantity)`` pairs per product."""
+    quantities = Counter()
+    for product_id, quantity in lines:
+        quantities[product_id] += quantity
+    return quantities
+
+
+def _adjust_category_stock(quantities, category_ids, sign):
+    """Move ``sign * quantity`` units per product into its category's ``total_stock``."""
+    stock = Counter()
+    for product_id, quantity in quantities.items():
+        if product_id in category_ids:
+            stock[category_ids[product_id]] += sign * quantity
+    for category_id in sorted(stock):
+        adjust_category(category_id, stock=stock[category_id])
+
+
+def reserve_stock(lines):
+    """
+    Take stock for ``lines`` (``(product_id, quantity)`` pairs). Either every
+    line is reserved or none is and :class:`InsufficientStock` is raised.
+    Returns ``{product_id: Product}`` as read after the reservation.
+    """
+    quantities = _quantities(lines)
+    with transaction.atomic():
+        short = []
+        for product_id in sorted(quantities):
+            updated = Product.objects.filter(
+                pk=product_id, stock_quantity__gte=quantities[product_id]
+            ).update(stock_quantity=F('stock_quantity') - quantities[product_id])
+            if not updated:
+                short.append(product_id)
+        products = Product.objects.in_bulk(quantities)
+        if short:
+            # Raising rolls back the lines that were reserved.
+            raise InsufficientStock({
+                pk: (quantities[pk], products[pk].stock_quantity if pk in products else 0)
+                for pk in short
+            })
+        category_ids = {pk: product.category_id for pk, product in products.items()}
+        _adjust_category_stock(quantities, category_ids, -1)
+    return products
+
+
+def release_stock(lines):
+    """Return stock for ``lines`` (``(product_id, quantity)`` pairs)."""
+    quantities = _quantities(lines)
+    with transaction.atomic():
+        for product_id in sorted(quantities):
+            Product.objects.filter(pk=product_id).update(
+                stock_quantity=F('stock_quantity') + quantities[product_id]
+            )
+        category_ids = dict(Product.objects.filter(pk__in=quantities).values_list('pk', 'category_id'))
+        _adjust_category_stock(quantities, category_ids, 1)
+
+
+def _order_lines(order):
+    return order.items.values_list('product_id', 'quantity')
+
+
+def create_order(order, lines):
+    """
+    Save the unsaved ``order`` with one item per ``(product_id, quantity)``
+    line, priced at the products' current prices, reserving their stock
+    unless the order is created cancelled. Raises :class:`InsufficientStock`
+    without saving anything.
+    """
+    lines = list(lines)
+    with transaction.atomic():
+        if order.status == CANCELLED:
+            products = Product.objects.in_bulk(_quantities(lines))
+        else:
+            products = reserve_stock(lines)
+        items = [
+            OrderItem(product_id=product_id, quantity=quantity, price=products[product_id].price)
+            for product_id, quantity in lines
+        ]
+        order.total_amount = sum((item.price * item.quantity for item in items), Decimal('0.00'))
+        # bulk_create sends no signals, but the order's post_save receivers
+        # (sales rollup, dashboard cache) run on commit, after the items exist.
+        order.save()
+        for item in items:
+            item.order = order
+        OrderItem.objects.bulk_create(items)
+    return order
+
+
+def set_status(order, status):
+    """
+    Change ``order``'s status, releasing its stock when it is cancelled and
+    reserving it again if it is reinstated (which may raise
+    :class:`InsufficientStock`).
+    """
+    with transaction.atomic():
+        # Claim the transition with a conditional update so two concurrent
+        # requests cannot both release, or both reserve, the same stock.
+        if status == CANCELLED:
+            claimed = Order.objects.filter(pk=order.pk).exclude(status=CANCELLED).update(status=status)
+            if claimed:
+                release_stock(_order_lines(order))
+        else:
+            claimed = Order.objects.filter(pk=order.pk, status=CANCELLED).update(status=status)
+            if claimed:
+                reserve_stock(_order_lines(order))
+        if not claimed and hasattr(order, '_loaded_values'):
+            # The row was already on this side of "cancelled" (possibly
+            # moved there concurrently); the customer's lifetime value must
+            # not move again when the order is saved below.
+            order._loaded_values['status'] = status
+        order.status = status
+        # Saving (rather than only updating) sends post_save for the rollup
+        # and dashboard cache.
+        order.save(update_fields=['status'])
+    return order
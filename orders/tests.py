@@ -1,9 +1,25 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
 
-from accounts.models import Customer
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Customer, User
 from products.models import Category, Product
 
 from .models import Order, OrderItem
+from .stock import InsufficientStock, create_order, set_status
 
 
 class OrderModelTest(TestCase):
@@ -49,3 +65,305 @@ class OrderModelTest(TestCase):
         self.assertEqual(self.order_item.product.name, 'Test Product')
         self.assertEqual(self.order_item.quantity, 2)
         self.assertEqual(self.order_item.price, 10.00)
+
+
+class AdminOrdersPaginationTest(TestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            username='staff', password='staffpass', is_staff=True
+        )
+        self.client.force_login(self.staff)
+        self.customer = Customer.objects.create(
+            username='pager', email='pager@example.com', password='x'
+        )
+        created_at = timezone.now()
+        self.orders = []
+        for index in range(7):
+            order = Order.objects.create(
+                customer=self.customer,
+                total_amount=10,
+                status='delivered' if index % 2 else 'pending',
+            )
+            # Several orders share a timestamp so the order_id tie-breaker matters
+            Order.objects.filter(pk=order.pk).update(created_at=created_at - timedelta(minutes=index // 3))
+            self.orders.append(order)
+        self.expected = list(
+            Order.objects.order_by('-created_at', '-order_id').values_list('order_id', flat=True)
+        )
+
+    def _ids(self, response):
+        return [order.order_id for order in response.context['page']]
+
+    def test_walks_forward_and_back_without_gaps(self):
+        url = reverse('admin_orders')
+        first = self.client.get(url, {'page_size': 3})
+        self.assertEqual(self._ids(first), self.expected[:3])
+        self.assertFalse(first.context['page'].has_previous)
+
+        second = self.client.get(url + first.context['page'].next_url)
+        self.assertEqual(self._ids(second), self.expected[3:6])
+
+        third = self.client.get(url + second.context['page'].next_url)
+        self.assertEqual(self._ids(third), self.expected[6:])
+        self.assertFalse(third.context['page'].has_next)
+
+        back = self.client.get(url + third.context['page'].previous_url)
+        self.assertEqual(self._ids(back), self.expected[3:6])
+
+    def test_cursor_keeps_status_filter(self):
+        url = reverse('admin_orders')
+        first = self.client.get(url, {'status': 'pending', 'page_size': 2})
+        next_url = first.context['page'].next_url
+        self.assertIn('status=pending', next_url)
+        second = self.client.get(url + next_url)
+        self.assertTrue(all(order.status == 'pending' for order in second.context['page']))
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('admin_orders'), {'cursor': 'not-a-cursor', 'page_size': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._ids(response), self.expected[:3])
+
+
+class AdminOrdersQueryCountTest(TestCase):
+
+    def test_list_query_count_is_fixed_for_1000_orders(self):
+        self.client.force_login(
+            User.objects.create_user(username='staff', password='staffpass', is_staff=True)
+        )
+        category = Category.objects.create(name='Bulk')
+        product = Product.objects.create(name='Widget', price=1, stock_quantity=10, category=category)
+        customers = Customer.objects.bulk_create(
+            Customer(username=f'bulk{i}', email=f'bulk{i}@example.com', password='x') for i in range(10)
+        )
+        orders = Order.objects.bulk_create(
+            Order(customer=customers[i % 10], total_amount=2) for i in range(1000)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=product, quantity=1, price=1) for order in orders for _ in range(2)
+        )
+
+        # session, user, orders page (customer joined, item counts annotated)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('admin_orders'), {'page_size': 200})
+        self.assertEqual(response.context['page'].object_list[0].item_count, 2)
+
+
+class StockReservationTest(TestCase):
+
+    def setUp(self):
+        self.customer = Customer.objects.create(username='buyer', email='buyer@example.com', password='x')
+        category = Category.objects.create(name='Stock')
+        self.lamp = Product.objects.create(name='Lamp', price=Decimal('5.00'), stock_quantity=3, category=category)
+        self.desk = Product.objects.create(name='Desk', price=Decimal('80.00'), stock_quantity=1, category=category)
+        self.client.force_login(User.objects.create_user(username='staff', password='x', is_staff=True))
+
+    def _stock(self):
+        return dict(Product.objects.values_list('name', 'stock_quantity'))
+
+    def test_create_order_reserves_stock(self):
+        order = create_order(Order(customer=self.customer), [(self.lamp.pk, 2), (self.desk.pk, 1)])
+        self.assertEqual(order.total_amount, Decimal('90.00'))
+        self.assertEqual(order.items.count(), 2)
+        self.assertEqual(self._stock(), {'Lamp': 1, 'Desk': 0})
+
+    def test_short_stock_rejects_whole_order(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            create_order(Order(customer=self.customer), [(self.lamp.pk, 2), (self.desk.pk, 2)])
+        self.assertEqual(raised.exception.shortages, {self.desk.pk: (2, 1)})
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self._stock(), {'Lamp': 3, 'Desk': 1})
+
+    def test_cancel_releases_and_reinstate_reserves(self):
+        order = create_order(Order(customer=self.customer), [(self.lamp.pk, 1), (self.lamp.pk, 1)])
+        self.assertEqual(self._stock()['Lamp'], 1)
+
+        set_status(order, 'cancelled')
+        set_status(order, 'cancelled')
+        self.assertEqual(self._stock()['Lamp'], 3)
+
+        set_status(order, 'processing')
+        self.assertEqual(self._stock()['Lamp'], 1)
+
+    def _post_order(self, quantity):
+        return self.client.post(reverse('admin_order_create'), {
+            'customer': self.customer.pk,
+            'status': 'pending',
+            'items-TOTAL_FORMS': 1,
+            'items-INITIAL_FORMS': 0,
+            'items-MIN_NUM_FORMS': 1,
+            'items-MAX_NUM_FORMS': 1000,
+            'items-0-product': self.lamp.pk,
+            'items-0-quantity': quantity,
+        })
+
+    def test_create_view_reports_shortage(self):
+        response = self._post_order(4)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Only 3 in stock.', response.context['formset'].forms[0].errors['quantity'])
+
+        response = self._post_order(3)
+        order = Order.objects.get()
+        self.assertRedirects(response, reverse('admin_order_detail', args=[order.pk]))
+        self.assertEqual(self._stock()['Lamp'], 0)
+
+        self.client.post(reverse('admin_order_detail', args=[order.pk]), {'status': 'cancelled'})
+        self.assertEqual(self._stock()['Lamp'], 3)
+
+
+class ConcurrentStockReservationTest(SimpleTestCase):
+    """
+    Places orders from several threads at once. SQLite's in-memory test
+    database cannot be shared between threads with real locking, so the
+    (empty, migrated) test database is copied to a file and every thread
+    opens its own connection to that.
+    """
+
+    databases = {'default'}
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'stock.sqlite3')
+        connection.ensure_connection()
+        target = sqlite3.connect(self.path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _on_file_db(self, function, *args):
+        """Run ``function(*args)`` in a new thread connected to the file database."""
+        outcome = {}
+        wrapper_class = type(connections['default'])
+        settings_dict = {**connections['default'].settings_dict, 'NAME': self.path}
+
+        def target():
+            connections['default'] = wrapper_class(settings_dict, 'default')
+            try:
+                outcome['result'] = function(*args)
+            except Exception as exc:
+                outcome['error'] = exc
+            finally:
+                connections['default'].close()
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        return thread, outcome
+
+    def _run(self, function, *args):
+        thread, outcome = self._on_file_db(function, *args)
+        thread.join()
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['result']
+
+    def test_concurrent_orders_never_oversell(self):
+        def setup():
+            customer = Customer.objects.create(username='rush', email='rush@example.com', password='x')
+            category = Category.objects.create(name='Rush')
+            return customer.pk, [
+                Product.objects.create(name=name, price=Decimal('1.00'), stock_quantity=10, category=category).pk
+                for name in ('A', 'B')
+            ]
+
+        customer_id, (a, b) = self._run(setup)
+        barrier = threading.Barrier(8)
+
+        def place(lines):
+            barrier.wait()
+            return create_order(Order(customer_id=customer_id), lines)
+
+        # Half the threads list the products in the opposite order, which
+        # would deadlock if locks were taken in line order.
+        runs = [self._on_file_db(place, [(a, 2), (b, 2)] if i % 2 else [(b, 2), (a, 2)]) for i in range(8)]
+        for thread, _ in runs:
+            thread.join()
+
+        outcomes = [outcome for _, outcome in runs]
+        self.assertEqual(sum('result' in outcome for outcome in outcomes), 5)
+        self.assertTrue(all(
+            isinstance(outcome['error'], InsufficientStock) for outcome in outcomes if 'error' in outcome
+        ))
+        stock, order_count, item_count = self._run(lambda: (
+            dict(Product.objects.values_list('name', 'stock_quantity')),
+            Order.objects.count(),
+            OrderItem.objects.count(),
+        ))
+        self.assertEqual(stock, {'A': 0, 'B': 0})
+        self.assertEqual((order_count, item_count), (5, 10))
+
+
+class OrderExportTest(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username='staff', password='x', is_staff=True))
+        category = Category.objects.create(name='Export')
+        self.product = Product.objects.create(name='Crate', price=Decimal('4.00'), stock_quantity=0, category=category)
+        self.customer = Customer.objects.create(username='finance', email='finance@example.com', password='x')
+
+    def _orders(self, count, status='delivered'):
+        orders = Order.objects.bulk_create(
+            Order(customer=self.customer, total_amount=Decimal('8.00'), status=status) for _ in range(count)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=self.product, quantity=2, price=Decimal('4.00')) for order in orders
+        )
+        return orders
+
+    def test_csv_honours_list_filters(self):
+        delivered = self._orders(3)
+        self._orders(2, status='pending')
+
+        response = self.client.get(reverse('admin_orders_export'), {'status': 'delivered'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ['order_id', 'customer', 'customer_email', 'status', 'total_amount', 'item_count', 'created_at'])
+        self.assertEqual([int(row[0]) for row in rows[1:]], [order.pk for order in delivered])
+        self.assertEqual(rows[1][1:6], ['finance', 'finance@example.com', 'delivered', '8.00', '1'])
+
+    def test_invalid_product_filter_rejected_before_streaming(self):
+        self._orders(1)
+        response = self.client.get(reverse('admin_orders_export'), {'product': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.streaming)
+
+        response = self.client.get(reverse('admin_orders'), {'product': 'abc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page']), 1)
+        self.assertContains(response, 'Invalid product filter')
+
+    def test_header_sent_before_rows_are_queried(self):
+        self._orders(3)
+        response = self.client.get(reverse('admin_orders_export'))
+        content = iter(response.streaming_content)
+        with self.assertNumQueries(0):
+            self.assertTrue(next(content).startswith(b'order_id,'))
+
+    def test_ndjson(self):
+        orders = self._orders(2)
+        response = self.client.get(reverse('admin_orders_export'), {'format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['order_id'] for line in lines], [order.pk for order in orders])
+        self.assertEqual(json.loads(lines[0])['total_amount'], '8.00')
+
+    @override_settings(EXPORT_CHUNK_SIZE=50)
+    def test_memory_does_not_grow_with_rows(self):
+        def peak_kb():
+            response = self.client.get(reverse('admin_orders_export'))
+            tracemalloc.start()
+            try:
+                for _ in response.streaming_content:
+                    pass
+                return tracemalloc.get_traced_memory()[1] / 1024
+            finally:
+                tracemalloc.stop()
+
+        self._orders(200)
+        small = peak_kb()
+        self._orders(2000)
+        large = peak_kb()
+        self.assertLess(large, small * 1.5 + 64)
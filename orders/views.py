@@ -1,45 +1,120 @@
-from decimal import Decimal
-
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Q
+from django.core.exceptions import ValidationError
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, redirect, render
 
 from .forms import OrderForm, OrderItemFormSet
-from .models import Order
+from .models import Order, OrderItem
+from .stock import InsufficientStock, create_order, set_status
+from ecommerce.exports import export_response
+from ecommerce.pagination import paginate
+from ecommerce.routers import use_replica
 from products.models import Product
+from search.backends import matching, numeric_id
 
 
-@staff_member_required
-def admin_orders(request):
-    """Admin view for managing all orders"""
-    orders = Order.objects.select_related('customer').prefetch_related('items__product').order_by('-created_at')
-    
+# (header, lookup) pairs for the CSV / NDJSON export.
+ORDER_EXPORT_COLUMNS = [
+    ('order_id', 'order_id'),
+    ('customer', 'customer__username'),
+    ('customer_email', 'customer__email'),
+    ('status', 'status'),
+    ('total_amount', 'total_amount'),
+    ('item_count', 'item_count'),
+    ('created_at', 'created_at'),
+]
+
+
+def _orders_with_item_count():
+    # Count items with a correlated subquery so only the rows on the current
+    # page are counted, instead of grouping the whole order table.
+    item_count = (
+        OrderItem.objects.filter(order=OuterRef('pk'))
+        .order_by()
+        .values('order')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Order.objects.annotate(item_count=Coalesce(Subquery(item_count), 0))
+
+
+def product_filter_id(params):
+    """The ``product`` filter as a product id (``None`` if unset); ``ValidationError`` if it is not one."""
+    value = params.get('product')
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError(f'Invalid product filter "{value}": expected a product id.')
+
+
+def filter_orders(orders, params):
+    """
+    Apply the ``status``, ``search`` and ``product`` filters of the order
+    list. Raises ``ValidationError`` for an invalid ``product`` filter.
+    """
     # Filter by status if requested
-    status_filter = request.GET.get('status')
+    status_filter = params.get('status')
     if status_filter:
         orders = orders.filter(status=status_filter)
-    
+
     # Search functionality
-    search_query = request.GET.get('search')
+    search_query = params.get('search')
     if search_query:
-        orders = orders.filter(
-            Q(order_id__icontains=search_query) |
-            Q(customer__username__icontains=search_query) |
-            Q(customer__email__icontains=search_query)
-        )
-    
-    product_filter = request.GET.get('product')
+        order_id = numeric_id(search_query)
+        if order_id is not None:
+            orders = orders.filter(order_id=order_id)
+        else:
+            # Orders of matching customers and orders containing matching products
+            orders = orders.filter(
+                Q(customer_id__in=matching('customer', search_query))
+                | Q(pk__in=OrderItem.objects.filter(product_id__in=matching('product', search_query)).values('order_id'))
+            )
+
+    product_id = product_filter_id(params)
+    if product_id is not None:
+        orders = orders.filter(items__product__product_id=product_id).distinct()
+    return orders
+
+
+def order_export_queryset(params):
+    return filter_orders(_orders_with_item_count(), params).order_by('order_id')
+
+
+@staff_member_required
+@use_replica
+def admin_orders(request):
+    """Admin view for managing all orders"""
+    params = request.GET
+    try:
+        product_id = product_filter_id(params)
+    except ValidationError as e:
+        # Show the list without the unusable filter.
+        messages.error(request, e.messages[0])
+        params = params.copy()
+        del params['product']
+        product_id = None
+    orders = filter_orders(
+        _orders_with_item_count().select_related('customer').order_by('-created_at'),
+        params,
+    )
+    status_filter = params.get('status')
+    search_query = params.get('search')
+
+    product_filter = params.get('product')
     product_reference = None
-    if product_filter:
-        orders = orders.filter(items__product__product_id=product_filter).distinct()
-        try:
-            product_reference = Product.objects.get(product_id=product_filter)
-        except (Product.DoesNotExist, ValueError):
-            product_reference = None
+    if product_id is not None:
+        product_reference = Product.objects.filter(product_id=product_id).first()
+
+    page = paginate(request, orders, ('-created_at', '-order_id'))
 
     context = {
-        'orders': orders,
+        'orders': page,
+        'page': page,
         'status_filter': status_filter,
         'search_query': search_query,
         'product_filter': product_filter,
@@ -48,6 +123,18 @@ def admin_orders(request):
     }
     return render(request, 'orders/admin_orders.html', context)
 
+
+@staff_member_required
+def admin_orders_export(request):
+    """Stream every order matching the list filters as CSV or NDJSON"""
+    # Validate before streaming: once the headers are sent, an error can
+    # only cut the body short.
+    try:
+        orders = order_export_queryset(request.GET)
+    except ValidationError as e:
+        return HttpResponseBadRequest(e.messages[0])
+    return export_response(request, 'orders', orders, ORDER_EXPORT_COLUMNS)
+
 @staff_member_required
 def admin_order_detail(request, order_id):
     """Admin view for order details"""
@@ -57,9 +144,12 @@ def admin_order_detail(request, order_id):
         # Update order status
         new_status = request.POST.get('status')
         if new_status in ['pending', 'processing', 'shipped', 'delivered', 'cancelled']:
-            order.status = new_status
-            order.save()
-            messages.success(request, f'Order status updated to {new_status.title()}')
+            try:
+                set_status(order, new_status)
+            except InsufficientStock:
+                messages.error(request, 'Not enough stock to reinstate this order.')
+            else:
+                messages.success(request, f'Order status updated to {new_status.title()}')
             return redirect('admin_order_detail', order_id=order_id)
     
     context = {
@@ -76,23 +166,23 @@ def admin_order_create(request):
         formset = OrderItemFormSet(request.POST, instance=provisional_order, prefix='items')
 
         if form.is_valid() and formset.is_valid():
-            order = form.save(commit=False)
-            order.total_amount = Decimal('0.00')
-            order.save()
-
-            formset.instance = order
-            total_amount = Decimal('0.00')
-            order_items = formset.save(commit=False)
-            for item in order_items:
-                item.price = item.product.price
-                item.save()
-                total_amount += item.price * item.quantity
-
-            order.total_amount = total_amount
-            order.save()
-
-            messages.success(request, 'Order created successfully.')
-            return redirect('admin_order_detail', order_id=order.order_id)
+            lines = [
+                (item_form.cleaned_data['product'].pk, item_form.cleaned_data['quantity'])
+                for item_form in formset.forms
+                if item_form.cleaned_data
+            ]
+            try:
+                order = create_order(form.save(commit=False), lines)
+            except InsufficientStock as exc:
+                for item_form in formset.forms:
+                    product = item_form.cleaned_data.get('product')
+                    if product is not None and product.pk in exc.shortages:
+                        available = exc.shortages[product.pk][1]
+                        item_form.add_error('quantity', f'Only {available} in stock.')
+                messages.error(request, 'Not enough stock to place this order.')
+            else:
+                messages.success(request, 'Order created successfully.')
+                return redirect('admin_order_detail', order_id=order.order_id)
     else:
         form = OrderForm()
         formset = OrderItemFormSet(instance=Order(), prefix='items')
@@ -1,5 +1,7 @@
 from django import forms
 
+from orders.models import Order
+
 from .models import Payment
 
 
@@ -16,6 +18,12 @@ class AdminPaymentForm(forms.ModelForm):
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Order.__str__ shows the customer's username; join it up front so
+        # rendering the order choices does not query once per order.
+        self.fields['order'].queryset = Order.objects.select_related('customer')
+
     def clean_amount(self):
         amount = self.cleaned_data.get('amount')
         if amount is None or amount <= 0:
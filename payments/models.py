@@ -29,4 +29,11 @@ class Payment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"Payment #{self.payment_id} for Order #{self.order.order_id}"
\ No newline at end of file
+        return f"Payment #{self.payment_id} for Order #{self.order.order_id}"
+
+    class Meta:
+        indexes = [
+            # Payment list pages, unfiltered and filtered by status.
+            models.Index(fields=['-created_at', '-payment_id'], name='payment_created_idx'),
+            models.Index(fields=['status', '-created_at', '-payment_id'], name='payment_status_created_idx'),
+        ]
\ No newline at end of file
@@ -1,44 +1,92 @@
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Q, Sum
+from django.db.models import Count, Q, Sum
 from django.shortcuts import get_object_or_404, redirect, render
 
 from .forms import AdminPaymentForm
 from .models import Payment
+from ecommerce.exports import export_response
+from ecommerce.pagination import paginate
+from ecommerce.routers import use_replica
+from search.backends import matching, numeric_id
 
 
-@staff_member_required
-def admin_payments(request):
-    """Admin view for managing all payments"""
-    payments = Payment.objects.select_related('order__customer').order_by('-created_at')
-    
+# (header, lookup) pairs for the CSV / NDJSON export.
+PAYMENT_EXPORT_COLUMNS = [
+    ('payment_id', 'payment_id'),
+    ('order_id', 'order_id'),
+    ('customer', 'order__customer__username'),
+    ('payment_method', 'payment_method'),
+    ('amount', 'amount'),
+    ('status', 'status'),
+    ('transaction_id', 'transaction_id'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+
+def filter_payments(payments, params):
+    """Apply the ``status`` and ``search`` filters of the payment list."""
     # Filter by status if requested
-    status_filter = request.GET.get('status')
+    status_filter = params.get('status')
     if status_filter:
         payments = payments.filter(status=status_filter)
-    
+
     # Search functionality
-    search_query = request.GET.get('search')
+    search_query = params.get('search')
     if search_query:
-        payments = payments.filter(
-            Q(payment_id__icontains=search_query) |
-            Q(order__order_id__icontains=search_query) |
-            Q(order__customer__username__icontains=search_query)
-        )
-    
-    # Calculate summary stats
-    total_payments = payments.aggregate(total=Sum('amount'))['total'] or 0
-    
+        object_id = numeric_id(search_query)
+        if object_id is not None:
+            payments = payments.filter(Q(payment_id=object_id) | Q(order_id=object_id))
+        else:
+            payments = payments.filter(order__customer_id__in=matching('customer', search_query))
+    return payments
+
+
+def payment_export_queryset(params):
+    return filter_payments(Payment.objects.all(), params).order_by('payment_id')
+
+
+@staff_member_required
+@use_replica
+def admin_payments(request):
+    """Admin view for managing all payments"""
+    payments = filter_payments(
+        Payment.objects.select_related('order__customer').order_by('-created_at'), request.GET
+    )
+    status_filter = request.GET.get('status')
+    search_query = request.GET.get('search')
+
+    # Calculate summary stats over the whole filtered set in one query
+    summary = payments.aggregate(
+        total=Sum('amount'),
+        count=Count('payment_id'),
+        pending=Count('payment_id', filter=Q(status='pending')),
+        failed=Count('payment_id', filter=Q(status='failed')),
+    )
+
+    page = paginate(request, payments, ('-created_at', '-payment_id'))
+
     context = {
-        'payments': payments,
+        'payments': page,
+        'page': page,
         'status_filter': status_filter,
         'search_query': search_query,
-        'total_payments': total_payments,
+        'total_payments': summary['total'] or 0,
+        'total_transactions': summary['count'],
+        'pending_payments': summary['pending'],
+        'failed_payments': summary['failed'],
         'payment_statuses': Payment.objects.values_list('status', flat=True).distinct(),
     }
     return render(request, 'payments/admin_payments.html', context)
 
 
+@staff_member_required
+def admin_payments_export(request):
+    """Stream every payment matching the list filters as CSV or NDJSON"""
+    return export_response(request, 'payments', payment_export_queryset(request.GET), PAYMENT_EXPORT_COLUMNS)
+
+
 @staff_member_required
 def admin_payment_detail(request, payment_id):
     """Admin view for payment details"""
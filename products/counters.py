@@ -0,0 +1,84 @@
+"""
+Denormalised product counters on :class:`~products.models.Category`.
+
+``product_count`` and ``total_stock`` (units in stock across the category's
+products) are moved with ``UPDATE ... SET total_stock = total_stock + n``
+statements in the transaction that writes the product (see
+``products.signals``) or its stock (``orders.stock``), so the category list,
+inventory page and API read them without aggregating over products.
+
+Writes that send no signals (``bulk_create``, queryset ``update()``, raw
+SQL) bypass the counters; :func:`recount_categories` recomputes them in bulk.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Category, Product
+
+
+def adjust_category(category_id, products=0, stock=0):
+    """Add ``products`` and ``stock`` (either may be negative) to a category's counters."""
+    if category_id is None or (not products and not stock):
+        return
+    Category.objects.filter(pk=category_id).update(
+        product_count=F('product_count') + products,
+        total_stock=F('total_stock') + stock,
+    )
+
+
+class StockChanged(Exception):
+    """Raised when a stock change would take a product's stock below zero."""
+
+
+def move_stock(product, delta):
+    """
+    Add ``delta`` units (may be negative) to ``product``'s stock and its
+    category's ``total_stock`` with relative updates, so units reserved
+    concurrently (see ``orders.stock``) are kept. Raises :class:`StockChanged`
+    instead of going below zero.
+    """
+    if not delta:
+        return
+    with transaction.atomic():
+        updated = Product.objects.filter(pk=product.pk, stock_quantity__gte=max(-delta, 0)).update(
+            stock_quantity=F('stock_quantity') + delta
+        )
+        if not updated:
+            raise StockChanged(f'Product #{product.pk} has fewer than {-delta} units in stock.')
+        adjust_category(product.category_id, stock=delta)
+    product.stock_quantity = Product.objects.values_list('stock_quantity', flat=True).get(pk=product.pk)
+    if getattr(product, '_loaded_values', None) is not None:
+        product._loaded_values['stock_quantity'] = product.stock_quantity
+
+
+def _actual_counts():
+    products = Product.objects.filter(category=OuterRef('pk')).order_by().values('category')
+    return {
+        'product_count': Coalesce(Subquery(products.annotate(count=Count('pk')).values('count')), 0),
+        'total_stock': Coalesce(Subquery(products.annotate(stock=Sum('stock_quantity')).values('stock')), 0),
+    }
+
+
+def refresh_categories(ids):
+    """Recompute the counters of the categories in ``ids`` with one UPDATE."""
+    Category.objects.filter(pk__in=ids).update(**_actual_counts())
+
+
+def recount_categories(ids=None):
+    """
+    Recompute the counters of the categories in ``ids`` (all when ``None``)
+    from their products. Returns the number of categories that had drifted.
+    """
+    actual = _actual_counts()
+    categories = Category.objects.all() if ids is None else Category.objects.filter(pk__in=ids)
+    drifted = categories.alias(
+        actual_product_count=actual['product_count'], actual_total_stock=actual['total_stock']
+    ).filter(
+        ~Q(product_count=F('actual_product_count')) | ~Q(total_stock=F('actual_total_stock'))
+    )
+    drifted_ids = list(drifted.values_list('pk', flat=True))
+    if drifted_ids:
+        Category.objects.filter(pk__in=drifted_ids).update(**actual)
+    return len(drifted_ids)
@@ -0,0 +1,152 @@
+"""
+Product image renditions.
+
+When a product image is uploaded (see ``products/signals.py``) it is
+rendered once into ``PRODUCT_IMAGE_WIDTHS`` sizes, each as WebP and JPEG.
+Every rendition:
+
+* is rotated according to the EXIF orientation, then saved without EXIF
+  (camera make, GPS position, ...),
+* fits within ``PRODUCT_IMAGE_MAX_DIMENSION`` on both sides and is never
+  larger than the original,
+* is named after a hash of the original's content
+  (``product_images/renditions/<hash>-<width>.<ext>``), so its URL changes
+  whenever the image does and the files can be cached forever.
+
+Pages use the renditions through the ``product_images`` template tags
+(``srcset`` lists the browser picks the smallest sufficient file from)
+instead of the full-size upload. ``render_renditions`` only touches storage,
+not the database, so the ``generate_thumbnails`` command can run it in a
+process pool.
+"""
+
+import hashlib
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+logger = logging.getLogger(__name__)
+
+RENDITION_DIR = 'product_images/renditions'
+DEFAULT_WIDTHS = (100, 300, 600, 1200)
+DEFAULT_MAX_DIMENSION = 1200
+DEFAULT_QUALITY = 80
+HASH_LENGTH = 16
+
+# (extension, Pillow format, MIME type), best compression first.
+FORMATS = (
+    ('webp', 'WEBP', 'image/webp'),
+    ('jpg', 'JPEG', 'image/jpeg'),
+)
+
+
+class ImageProcessingError(Exception):
+    pass
+
+
+def get_widths():
+    return tuple(sorted(getattr(settings, 'PRODUCT_IMAGE_WIDTHS', DEFAULT_WIDTHS)))
+
+
+def get_max_dimension():
+    return getattr(settings, 'PRODUCT_IMAGE_MAX_DIMENSION', DEFAULT_MAX_DIMENSION)
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def rendition_name(image_hash, width, extension):
+    return f'{RENDITION_DIR}/{image_hash}-{width}.{extension}'
+
+
+def rendition_widths(largest_width):
+    """The configured widths an image ``largest_width`` pixels wide is rendered at."""
+    return sorted({min(width, largest_width) for width in get_widths()})
+
+
+def _flatten(image):
+    """Composite transparent images onto white; JPEG has no alpha channel."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _encode(image, pillow_format):
+    buffer = BytesIO()
+    quality = getattr(settings, 'PRODUCT_IMAGE_QUALITY', DEFAULT_QUALITY)
+    if pillow_format == 'JPEG':
+        image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buffer, pillow_format, quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def render_renditions(name, storage=None, force=False):
+    """
+    Render the image stored as ``name`` into every rendition. Returns
+    ``(hash, width, height)`` of the largest rendition. Existing renditions
+    of the same content are kept unless ``force``.
+    """
+    storage = storage or default_storage
+    try:
+        with storage.open(name, 'rb') as handle:
+            data = handle.read()
+        image = Image.open(BytesIO(data))
+        image = ImageOps.exif_transpose(image)
+        image = _flatten(image)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        raise ImageProcessingError(f'Could not read {name}: {e}') from e
+
+    image_hash = content_hash(data)
+    max_dimension = get_max_dimension()
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    for width in rendition_widths(image.width):
+        resized = image if width == image.width else image.resize(
+            (width, max(1, round(image.height * width / image.width))), Image.LANCZOS
+        )
+        for extension, pillow_format, _ in FORMATS:
+            path = rendition_name(image_hash, width, extension)
+            if storage.exists(path):
+                if not force:
+                    continue
+                storage.delete(path)
+            storage.save(path, ContentFile(_encode(resized, pillow_format)))
+    return image_hash, image.width, image.height
+
+
+def process_product_image(product):
+    """
+    Render ``product``'s image and store the rendition hash and size on it
+    (with a queryset update, so no signals are sent). Unreadable images are
+    logged and left without renditions; pages then fall back to the upload.
+    """
+    values = {'image_hash': '', 'image_width': None, 'image_height': None}
+    if product.image_url:
+        try:
+            image_hash, width, height = render_renditions(product.image_url.name)
+        except ImageProcessingError as e:
+            logger.warning('Product %s: %s', product.pk, e)
+        else:
+            values = {'image_hash': image_hash, 'image_width': width, 'image_height': height}
+    type(product).objects.filter(pk=product.pk).update(**values)
+    for field, value in values.items():
+        setattr(product, field, value)
+
+
+def renditions(product, extension):
+    """``[(url, width), ...]`` of ``product``'s renditions in one format, smallest first."""
+    if not product.image_hash:
+        return []
+    return [
+        (default_storage.url(rendition_name(product.image_hash, width, extension)), width)
+        for width in rendition_widths(product.image_width)
+    ]
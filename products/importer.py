@@ -0,0 +1,211 @@
+"""
+Bulk product import from CSV.
+
+The file is read row by row and handled in chunks: each chunk is validated
+in Python (categories are resolved through one name -> id map loaded up
+front), then written with a single ``INSERT ... ON CONFLICT (sku) DO UPDATE``
+via ``bulk_create(update_conflicts=True)``. Invalid rows are skipped and
+reported with their line number; valid rows around them are still imported,
+and a SKU repeated anywhere in the file is rejected after its first row.
+Upserts send no signals, so each chunk recounts the denormalised counters of
+the categories it touched and reindexes the products it wrote for search in
+the same transaction.
+
+Expected columns: ``sku``, ``name``, ``price``, ``stock_quantity``,
+``category`` (category name) and optionally ``description``.
+"""
+
+import csv
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from dashboard.cache import invalidate_for_model
+from search.index import index_objects
+
+from .counters import refresh_categories
+from .models import Category, Product
+
+
+DEFAULT_CHUNK_SIZE = 1000
+
+REQUIRED_COLUMNS = ('sku', 'name', 'price', 'stock_quantity', 'category')
+UPDATE_FIELDS = ['name', 'description', 'price', 'stock_quantity', 'category']
+
+_SKU_LENGTH = Product._meta.get_field('sku').max_length
+_NAME_LENGTH = Product._meta.get_field('name').max_length
+_CATEGORY_LENGTH = Category._meta.get_field('name').max_length
+_PRICE_FIELD = Product._meta.get_field('price')
+_MAX_PRICE = Decimal(10) ** (_PRICE_FIELD.max_digits - _PRICE_FIELD.decimal_places)
+
+
+class InvalidImportFile(ValueError):
+    """Raised when the file as a whole cannot be imported (e.g. missing columns)."""
+
+
+class ImportResult:
+    """Counts and per-row errors collected during an import."""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.categories_created = 0
+        self.errors = []  # [(line_number, sku, message), ...]
+        self.seconds = 0.0
+
+    @property
+    def imported(self):
+        return self.created + self.updated
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        return (
+            f'{self.rows} rows in {self.seconds:.2f}s ({self.rows_per_second:.0f} rows/s): '
+            f'{self.created} created, {self.updated} updated, {len(self.errors)} rejected'
+        )
+
+
+class ProductImporter:
+    """
+    Import products from CSV text. ``create_categories`` adds unknown
+    category names instead of rejecting their rows; ``dry_run`` validates
+    without writing anything.
+    """
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, create_categories=False, dry_run=False):
+        self.chunk_size = chunk_size
+        self.create_categories = create_categories
+        self.dry_run = dry_run
+        self.categories = {
+            name.casefold(): pk for pk, name in Category.objects.values_list('pk', 'name')
+        }
+        # SKU -> line it was first accepted on, across the whole file.
+        self.seen_skus = {}
+
+    def run(self, lines):
+        """Import from ``lines`` (any iterable of CSV text lines, e.g. an open file)."""
+        result = ImportResult()
+        started = time.perf_counter()
+        self.seen_skus = {}
+        reader = csv.DictReader(lines)
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise InvalidImportFile(f"Missing column(s): {', '.join(missing)}")
+
+        chunk = []
+        for row in reader:
+            result.rows += 1
+            chunk.append((reader.line_num, row))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk, result)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk, result)
+
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def _import_chunk(self, chunk, result):
+        products = {}
+        for line, row in chunk:
+            product, error = self._build(row, result)
+            sku = (row.get('sku') or '').strip()
+            if error:
+                result.errors.append((line, sku, error))
+            elif sku in self.seen_skus:
+                result.errors.append((line, sku, f'Duplicate SKU; already on line {self.seen_skus[sku]}.'))
+            else:
+                self.seen_skus[sku] = line
+                products[sku] = (line, product)
+        if not products:
+            return
+
+        existing = dict(Product.objects.filter(sku__in=products).values_list('sku', 'category_id'))
+        result.updated += len(existing)
+        result.created += len(products) - len(existing)
+        if self.dry_run:
+            return
+        # Categories products are moving out of, as well as into.
+        category_ids = set(existing.values()) | {product.category_id for _, product in products.values()}
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                [product for _, product in products.values()],
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=UPDATE_FIELDS,
+            )
+            refresh_categories(category_ids)
+            index_objects('product', Product.objects.filter(sku__in=products))
+
+    def _build(self, row, result):
+        """Return ``(Product, None)`` for a valid row, else ``(None, message)``."""
+        sku = (row.get('sku') or '').strip()
+        name = (row.get('name') or '').strip()
+        category_name = (row.get('category') or '').strip()
+        if not sku:
+            return None, 'SKU is required.'
+        if len(sku) > _SKU_LENGTH:
+            return None, f'SKU is longer than {_SKU_LENGTH} characters.'
+        if not name:
+            return None, 'Name is required.'
+        if len(name) > _NAME_LENGTH:
+            return None, f'Name is longer than {_NAME_LENGTH} characters.'
+
+        try:
+            price = Decimal((row.get('price') or '').strip())
+        except InvalidOperation:
+            return None, f"Price {row.get('price')!r} is not a number."
+        if not price.is_finite() or price < 0 or price >= _MAX_PRICE:
+            return None, f'Price must be between 0 and {_MAX_PRICE}.'
+        price = price.quantize(Decimal(1).scaleb(-_PRICE_FIELD.decimal_places))
+
+        try:
+            stock_quantity = int((row.get('stock_quantity') or '').strip())
+        except ValueError:
+            return None, f"Stock quantity {row.get('stock_quantity')!r} is not a whole number."
+        if stock_quantity < 0:
+            return None, 'Stock quantity cannot be negative.'
+
+        category_id = self._category_id(category_name, result)
+        if category_id is None:
+            return None, f'Unknown category {category_name!r}.'
+
+        return Product(
+            sku=sku,
+            name=name,
+            description=(row.get('description') or '').strip(),
+            price=price,
+            stock_quantity=stock_quantity,
+            category_id=category_id,
+        ), None
+
+    def _category_id(self, name, result):
+        if not name:
+            return None
+        key = name.casefold()
+        if key not in self.categories and self.create_categories and len(name) <= _CATEGORY_LENGTH:
+            if self.dry_run:
+                # Count it once, as the real import would create it.
+                self.categories[key] = 0
+            else:
+                self.categories[key] = Category.objects.create(name=name).pk
+            result.categories_created += 1
+        return self.categories.get(key)
+
+
+def import_products(lines, **options):
+    """
+    Run a :class:`ProductImporter` over ``lines`` and invalidate the
+    dashboard cache the bulk writes bypass.
+    """
+    importer = ProductImporter(**options)
+    result = importer.run(lines)
+    if result.imported and not importer.dry_run:
+        invalidate_for_model(Product._meta.label)
+        invalidate_for_model(Category._meta.label)
+    return result
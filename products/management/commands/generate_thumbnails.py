@@ -0,0 +1,74 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from products.images import ImageProcessingError, render_renditions
+from products.models import Product
+
+
+def _render(name, force):
+    # Runs in a worker process; only touches storage, never the database.
+    try:
+        return render_renditions(name, force=force)
+    except ImageProcessingError as e:
+        return str(e)
+
+
+class Command(BaseCommand):
+    help = 'Render the resized WebP/JPEG renditions of product images that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes rendering images (default: one per CPU; 1 renders in-process).',
+        )
+        parser.add_argument('--force', action='store_true', help='Re-render every product image.')
+        parser.add_argument('--batch-size', type=int, default=200, help='Products updated per query.')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+        products = Product.objects.exclude(image_url='').exclude(image_url__isnull=True)
+        if not options['force']:
+            products = products.filter(image_hash='')
+        pending = list(products.order_by('pk').values_list('pk', 'image_url'))
+        if not pending:
+            self.stdout.write('No product images to render')
+            return
+
+        names = [name for _, name in pending]
+        force = repeat(options['force'])
+        if options['workers'] == 1:
+            results = map(_render, names, force)
+            self._save(pending, results, options['batch_size'])
+        else:
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as executor:
+                results = executor.map(_render, names, force, chunksize=max(1, len(names) // (options['workers'] * 4)))
+                self._save(pending, results, options['batch_size'])
+
+    def _save(self, pending, results, batch_size):
+        rendered, failed, batch = 0, 0, []
+        for (pk, _), result in zip(pending, results):
+            if isinstance(result, str):
+                failed += 1
+                self.stderr.write(f'Product {pk}: {result}')
+                continue
+            image_hash, width, height = result
+            batch.append(Product(pk=pk, image_hash=image_hash, image_width=width, image_height=height))
+            if len(batch) >= batch_size:
+                rendered += self._update(batch)
+                batch = []
+        rendered += self._update(batch)
+        message = f'Rendered images of {rendered} products'
+        if failed:
+            message += f', {failed} failed'
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def _update(self, batch):
+        Product.objects.bulk_update(batch, ['image_hash', 'image_width', 'image_height'])
+        return len(batch)
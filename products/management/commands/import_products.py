@@ -0,0 +1,53 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importer import DEFAULT_CHUNK_SIZE, InvalidImportFile, import_products
+
+
+class Command(BaseCommand):
+    help = 'Create or update products by SKU from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with sku, name, price, stock_quantity, category[, description].')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Rows validated and upserted per batch.',
+        )
+        parser.add_argument(
+            '--create-categories',
+            action='store_true',
+            help='Create unknown categories instead of rejecting their rows.',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Validate only; write nothing.')
+        parser.add_argument('--errors', help='Write the rejected rows (line, sku, error) to this CSV file.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as handle:
+                result = import_products(
+                    handle,
+                    chunk_size=options['chunk_size'],
+                    create_categories=options['create_categories'],
+                    dry_run=options['dry_run'],
+                )
+        except (OSError, InvalidImportFile, UnicodeDecodeError, csv.Error) as e:
+            raise CommandError(f'Could not import {options["path"]}: {e}')
+
+        if options['errors']:
+            with open(options['errors'], 'w', encoding='utf-8', newline='') as handle:
+                writer = csv.writer(handle)
+                writer.writerow(['line', 'sku', 'error'])
+                writer.writerows(result.errors)
+        else:
+            for line, sku, message in result.errors[:20]:
+                self.stderr.write(f'line {line} ({sku or "no SKU"}): {message}')
+            if len(result.errors) > 20:
+                self.stderr.write(f'... and {len(result.errors) - 20} more; use --errors to save them all')
+
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        if result.categories_created:
+            self.stdout.write(f'{prefix}{result.categories_created} categories created')
+        self.stdout.write(self.style.SUCCESS(prefix + result.summary()))
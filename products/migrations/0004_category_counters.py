@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-18 17:54
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Category = apps.get_model('products', 'Category')
+    Product = apps.get_model('products', 'Product')
+    products = Product.objects.filter(category=OuterRef('pk')).order_by().values('category')
+    Category.objects.update(
+        product_count=Coalesce(Subquery(products.annotate(count=Count('pk')).values('count')), 0),
+        total_stock=Coalesce(Subquery(products.annotate(stock=Sum('stock_quantity')).values('stock')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='total_stock',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
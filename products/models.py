@@ -1,9 +1,18 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import Q
+
+
+# Products with fewer units than this are "low stock" on the dashboards.
+LOW_STOCK_THRESHOLD = 10
 
 class Category(models.Model):
     category_id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=50, unique=True)
     description = models.TextField(blank=True, null=True)
+    # Denormalised from the category's products (see products.counters); kept
+    # current by the product signals, repaired by ``manage.py recount``.
+    product_count = models.PositiveIntegerField(default=0, editable=False)
+    total_stock = models.IntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
@@ -13,13 +22,50 @@ class Category(models.Model):
 
 class Product(models.Model):
     product_id = models.AutoField(primary_key=True)
+    # Supplier stock-keeping unit; the key bulk imports upsert on.
+    sku = models.CharField(max_length=64, unique=True, blank=True, null=True)
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.ForeignKey(Category, related_name='products', on_delete=models.CASCADE)
     stock_quantity = models.IntegerField()
     image_url = models.ImageField(upload_to='product_images/', blank=True, null=True)
+    # Content hash and size of the largest rendition of the image (see
+    # products/images.py); empty until the renditions exist.
+    image_hash = models.CharField(max_length=16, blank=True, default='', editable=False)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    def save(self, *args, **kwargs):
+        # The category counters move in a post_save receiver (see
+        # products.signals), which Django sends after the row is written;
+        # one transaction keeps the row and its counters in step.
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so the category counters can apply the difference on save.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    class Meta:
+        indexes = [
+            # Product list keyset pages.
+            models.Index(fields=['-created_at', '-product_id'], name='product_created_idx'),
+            # Low-stock alerts only ever look at the few products below the
+            # threshold. Queries must repeat the ``stock_quantity < 10`` term
+            # for SQLite to use a partial index.
+            models.Index(
+                fields=['stock_quantity'],
+                condition=Q(stock_quantity__lt=LOW_STOCK_THRESHOLD),
+                name='product_low_stock_idx',
+            ),
+        ]
+
@@ -0,0 +1,56 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .counters import adjust_category, recount_categories
+from .images import process_product_image
+from .models import Product
+
+
+@receiver(post_save, sender=Product)
+def update_category_counters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    category_id, stock = instance.category_id, int(instance.stock_quantity)
+    loaded = getattr(instance, '_loaded_values', None)
+    if created:
+        adjust_category(category_id, 1, stock)
+    elif loaded is None:
+        # An existing row saved from an unloaded instance: the previous
+        # values are unknown, so recount the category instead.
+        recount_categories([category_id])
+    else:
+        previous_id = loaded.get('category_id', category_id)
+        previous_stock = int(loaded.get('stock_quantity', stock))
+        if previous_id == category_id:
+            adjust_category(category_id, 0, stock - previous_stock)
+        else:
+            adjust_category(previous_id, -1, -previous_stock)
+            adjust_category(category_id, 1, stock)
+    instance._loaded_values = {**(loaded or {}), 'category_id': category_id, 'stock_quantity': stock}
+
+
+@receiver(post_save, sender=Product)
+def render_image_renditions(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    name = instance.image_url.name or None
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is not None and 'image_url' in loaded:
+        changed = (loaded['image_url'] or None) != name
+    else:
+        # New, or saved from an unloaded instance: render unless done already.
+        changed = bool(name) != bool(instance.image_hash)
+    if changed:
+        process_product_image(instance)
+    if loaded is not None:
+        loaded['image_url'] = name
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_category_counters(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    adjust_category(
+        loaded.get('category_id', instance.category_id),
+        -1,
+        -int(loaded.get('stock_quantity', instance.stock_quantity)),
+    )
@@ -0,0 +1,47 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from products.images import renditions
+
+
+register = template.Library()
+
+
+def _srcset(sources):
+    return ', '.join(f'{url} {width}w' for url, width in sources)
+
+
+@register.filter
+def image_srcset(product, extension='webp'):
+    """``srcset`` value listing ``product``'s renditions in one format (``webp`` or ``jpg``)."""
+    return _srcset(renditions(product, extension))
+
+
+@register.simple_tag
+def product_image(product, sizes='100vw', **attrs):
+    """
+    ``<picture>`` for ``product``'s image offering its WebP and JPEG
+    renditions, so the browser fetches the smallest file that fills
+    ``sizes``. Before the renditions exist it falls back to an ``<img>`` of
+    the upload. Other arguments become ``<img>`` attributes, e.g.
+    ``{% product_image product sizes="50px" class="rounded" %}``.
+    """
+    attrs.setdefault('alt', product.name)
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    jpeg = renditions(product, 'jpg')
+    if not jpeg:
+        return format_html('<img src="{}"{}>', product.image_url.url, flatatt(attrs))
+    # Intrinsic size, so the page does not shift when the image arrives.
+    attrs.setdefault('width', product.image_width)
+    attrs.setdefault('height', product.image_height)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}"><img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        _srcset(renditions(product, 'webp')),
+        sizes,
+        jpeg[-1][0],
+        _srcset(jpeg),
+        sizes,
+        flatatt(attrs),
+    )
@@ -1,4 +1,26 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+from django.urls import reverse
+
+from accounts.models import User
+from orders.stock import release_stock, reserve_stock
+
+from search.backends import search
+from search.models import SearchDocument
+
+from .counters import recount_categories
+from .images import rendition_name
+from .importer import InvalidImportFile, ProductImporter, import_products
 from .models import Category, Product
 
 class ProductModelTest(TestCase):
@@ -24,4 +46,269 @@ class ProductModelTest(TestCase):
         self.assertEqual(self.product.price, 19.99)
 
     def test_product_stock_quantity(self):
-        self.assertEqual(self.product.stock_quantity, 100)
\ No newline at end of file
+        self.assertEqual(self.product.stock_quantity, 100)
+
+
+class CategoryListQueryCountTest(TestCase):
+
+    def test_list_query_count_is_fixed_for_1000_categories(self):
+        staff = User.objects.create_user(username='staff', password='staffpass', is_staff=True)
+        self.client.force_login(staff)
+        categories = Category.objects.bulk_create(Category(name=f'Category {i}') for i in range(1000))
+        Product.objects.bulk_create(
+            Product(name=f'Product {i}', price=1, stock_quantity=1, category=category)
+            for i, category in enumerate(categories)
+        )
+        recount_categories()
+
+        # session, user, categories with their stored product counts
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('category_list'))
+        self.assertContains(response, '1 product<')
+
+
+class ProductImportTest(TestCase):
+
+    HEADER = 'sku,name,price,stock_quantity,category,description\n'
+
+    def setUp(self):
+        self.tools = Category.objects.create(name='Tools')
+        Product.objects.create(sku='HAM-1', name='Old Hammer', price=5, stock_quantity=1, category=self.tools)
+
+    def _lines(self, *rows):
+        return io.StringIO(self.HEADER + ''.join(row + '\n' for row in rows))
+
+    def test_upserts_by_sku_and_reports_bad_rows(self):
+        result = import_products(self._lines(
+            'HAM-1,Claw Hammer,12.5,40,tools,Forged steel',
+            'SAW-1,Hand Saw,19.99,10,Tools,',
+            'SAW-1,Hand Saw Again,19.99,10,Tools,',
+            'DRL-1,Drill,abc,3,Tools,',
+            'GLU-1,Glue,2.00,-1,Tools,',
+            'PNT-1,Paint,8.00,4,Paint,',
+            ',Nameless,1.00,1,Tools,',
+        ))
+        self.assertEqual((result.rows, result.created, result.updated), (7, 1, 1))
+        self.assertEqual([(line, sku) for line, sku, _ in result.errors], [
+            (4, 'SAW-1'), (5, 'DRL-1'), (6, 'GLU-1'), (7, 'PNT-1'), (8, ''),
+        ])
+        self.assertIn("Unknown category 'Paint'", result.errors[3][2])
+
+        hammer = Product.objects.get(sku='HAM-1')
+        self.assertEqual((hammer.name, hammer.price, hammer.stock_quantity), ('Claw Hammer', Decimal('12.50'), 40))
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertEqual(search('product', 'saw-1'), [Product.objects.get(sku='SAW-1').pk])
+
+    def test_query_count_is_per_chunk(self):
+        rows = [f'SKU-{i},Item {i},1.00,1,Tools,' for i in range(200)]
+        # Small enough for one INSERT under SQLite's 999 variable limit.
+        importer = ProductImporter(chunk_size=80)
+        # Per chunk: existing SKUs, savepoint, upsert, category counters,
+        # products to index, search documents, release.
+        with self.assertNumQueries(3 * 7):
+            result = importer.run(self._lines(*rows))
+        self.assertEqual(result.created, 200)
+
+    def test_duplicate_skus_across_chunks_and_partial_reindex(self):
+        SearchDocument.objects.filter(kind='product').delete()
+        importer = ProductImporter(chunk_size=2)
+        result = importer.run(self._lines(
+            'SAW-1,Hand Saw,19.99,10,Tools,',
+            'GLU-1,Glue,2.00,1,Tools,',
+            'SAW-1,Hand Saw Again,19.99,10,Tools,',
+        ))
+        self.assertEqual(result.errors, [(4, 'SAW-1', 'Duplicate SKU; already on line 2.')])
+        self.assertEqual(Product.objects.get(sku='SAW-1').name, 'Hand Saw')
+        # Only the imported products were indexed; the existing hammer was not touched.
+        self.assertEqual(
+            set(SearchDocument.objects.filter(kind='product').values_list('object_id', flat=True)),
+            set(Product.objects.filter(sku__in=['SAW-1', 'GLU-1']).values_list('pk', flat=True)),
+        )
+        self.assertEqual(search('product', 'saw'), [Product.objects.get(sku='SAW-1').pk])
+
+    def test_create_categories_and_dry_run(self):
+        result = import_products(self._lines('PNT-1,Paint,8.00,4,Paint,'), create_categories=True, dry_run=True)
+        self.assertEqual((result.created, result.categories_created, result.errors), (1, 1, []))
+        self.assertFalse(Category.objects.filter(name='Paint').exists())
+
+        import_products(self._lines('PNT-1,Paint,8.00,4,Paint,'), create_categories=True)
+        self.assertEqual(Product.objects.get(sku='PNT-1').category.name, 'Paint')
+
+    def test_missing_columns_rejected(self):
+        with self.assertRaises(InvalidImportFile):
+            import_products(io.StringIO('sku,name\nA,B\n'))
+
+    def test_upload_view_and_command(self):
+        self.client.force_login(User.objects.create_user(username='staff', password='x', is_staff=True))
+        upload = SimpleUploadedFile('catalog.csv', (self.HEADER + 'SAW-1,Saw,9.00,2,Tools,\nBAD,Bad,x,1,Tools,\n').encode())
+        response = self.client.post(reverse('product_import'), {'file': upload})
+        self.assertEqual(response.context['result'].created, 1)
+        self.assertContains(response, 'is not a number')
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'catalog.csv')
+            errors = os.path.join(tmpdir, 'errors.csv')
+            with open(path, 'w') as handle:
+                handle.write(self.HEADER + 'SAW-1,Saw,11.00,2,Tools,\nBAD,Bad,1,x,Tools,\n')
+            out = io.StringIO()
+            call_command('import_products', path, '--errors', errors, stdout=out)
+            self.assertIn('0 created, 1 updated, 1 rejected', out.getvalue())
+            with open(errors) as handle:
+                self.assertEqual(list(csv.reader(handle))[1][:2], ['3', 'BAD'])
+        self.assertEqual(Product.objects.get(sku='SAW-1').price, Decimal('11.00'))
+
+
+class CategoryCountersTest(TestCase):
+
+    def setUp(self):
+        self.tools = Category.objects.create(name='Tools')
+        self.garden = Category.objects.create(name='Garden')
+
+    def _counters(self, category):
+        category = Category.objects.get(pk=category.pk)
+        return category.product_count, category.total_stock
+
+    def test_products_are_counted_as_they_are_written(self):
+        product = Product.objects.create(name='Hammer', price=5, stock_quantity=4, category=self.tools)
+        Product.objects.create(name='Saw', price=9, stock_quantity=6, category=self.tools)
+        self.assertEqual(self._counters(self.tools), (2, 10))
+
+        product = Product.objects.get(pk=product.pk)
+        product.stock_quantity = 1
+        product.save()
+        self.assertEqual(self._counters(self.tools), (2, 7))
+
+        product.category = self.garden
+        product.save()
+        self.assertEqual(self._counters(self.tools), (1, 6))
+        self.assertEqual(self._counters(self.garden), (1, 1))
+
+        product.delete()
+        self.assertEqual(self._counters(self.garden), (0, 0))
+
+    def test_stock_reservations_move_total_stock(self):
+        hammer = Product.objects.create(name='Hammer', price=5, stock_quantity=4, category=self.tools)
+        rake = Product.objects.create(name='Rake', price=7, stock_quantity=3, category=self.garden)
+        reserve_stock([(hammer.pk, 3), (rake.pk, 1)])
+        self.assertEqual((self._counters(self.tools), self._counters(self.garden)), ((1, 1), (1, 2)))
+        release_stock([(hammer.pk, 2)])
+        self.assertEqual(self._counters(self.tools), (1, 3))
+
+    def test_import_and_recount(self):
+        Product.objects.create(sku='HAM-1', name='Hammer', price=5, stock_quantity=1, category=self.tools)
+        import_products(io.StringIO(
+            'sku,name,price,stock_quantity,category\n'
+            'HAM-1,Hammer,5.00,2,Garden\n'
+            'SAW-1,Saw,9.00,5,Tools\n'
+        ))
+        self.assertEqual((self._counters(self.tools), self._counters(self.garden)), ((1, 5), (1, 2)))
+
+        Category.objects.update(product_count=0, total_stock=0)
+        out = io.StringIO()
+        call_command('recount', 'categories', stdout=out)
+        self.assertIn('2 corrected', out.getvalue())
+        self.assertEqual((self._counters(self.tools), self._counters(self.garden)), ((1, 5), (1, 2)))
+
+    def test_edit_keeps_stock_reserved_while_the_form_was_open(self):
+        hammer = Product.objects.create(name='Hammer', price=5, stock_quantity=10, category=self.tools)
+        self.client.force_login(User.objects.create_user(username='staff', password='x', is_staff=True))
+        reserve_stock([(hammer.pk, 3)])
+        response = self.client.post(reverse('product_edit', args=[hammer.pk]), {
+            'name': 'Claw hammer', 'price': '6.00', 'category': self.garden.pk,
+            'stock_quantity': '12', 'stock_loaded': '10',
+        })
+        self.assertRedirects(response, reverse('product_list'), fetch_redirect_response=False)
+        hammer.refresh_from_db()
+        self.assertEqual((hammer.name, hammer.stock_quantity), ('Claw hammer', 9))
+        self.assertEqual((self._counters(self.tools), self._counters(self.garden)), ((0, 0), (1, 9)))
+        self.assertEqual(recount_categories(), 0)
+
+    def test_edit_cannot_remove_reserved_stock(self):
+        hammer = Product.objects.create(name='Hammer', price=5, stock_quantity=4, category=self.tools)
+        self.client.force_login(User.objects.create_user(username='staff', password='x', is_staff=True))
+        reserve_stock([(hammer.pk, 3)])
+        self.client.post(reverse('product_edit', args=[hammer.pk]), {
+            'name': 'Claw hammer', 'price': '5.00', 'category': self.tools.pk,
+            'stock_quantity': '0', 'stock_loaded': '4',
+        })
+        hammer.refresh_from_db()
+        self.assertEqual((hammer.name, hammer.stock_quantity), ('Hammer', 1))
+        self.assertEqual(self._counters(self.tools), (1, 1))
+
+    def test_counters_roll_back_with_the_row(self):
+        hammer = Product.objects.create(name='Hammer', price=5, stock_quantity=4, category=self.tools)
+        hammer.stock_quantity = 9
+        with mock.patch('products.signals.process_product_image', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                hammer.name = 'Claw hammer'
+                hammer.image_url = 'products/hammer.png'
+                hammer.save()
+        hammer.refresh_from_db()
+        self.assertEqual((hammer.name, hammer.stock_quantity), ('Hammer', 4))
+        self.assertEqual(self._counters(self.tools), (1, 4))
+
+
+class ProductImageTest(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        override = override_settings(MEDIA_ROOT=media.name, PRODUCT_IMAGE_WIDTHS=(100, 300, 600, 1200))
+        override.enable()
+        self.addCleanup(override.disable)
+        self.category = Category.objects.create(name='Tools')
+
+    def _upload(self, size=(2000, 1000), orientation=None):
+        image = Image.new('RGB', size, (200, 30, 30))
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera Maker'
+        if orientation:
+            exif[0x0112] = orientation
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def _rendition(self, product, width, extension):
+        return Image.open(os.path.join(self.media_root, rendition_name(product.image_hash, width, extension)))
+
+    def test_upload_renders_capped_renditions_without_exif(self):
+        # Orientation 6: stored landscape, displayed portrait.
+        product = Product.objects.create(
+            name='Drill', price=5, stock_quantity=1, category=self.category, image_url=self._upload(orientation=6),
+        )
+        product = Product.objects.get(pk=product.pk)
+        self.assertEqual((product.image_width, product.image_height), (600, 1200))
+        for width in (100, 300, 600):
+            for extension in ('webp', 'jpg'):
+                rendition = self._rendition(product, width, extension)
+                self.assertEqual(rendition.width, width)
+                self.assertEqual(len(rendition.getexif()), 0)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, rendition_name(product.image_hash, 1200, 'jpg'))))
+
+        html = Template('{% load product_images %}{% product_image product sizes="50px" class="rounded" %}').render(
+            Context({'product': product})
+        )
+        self.assertIn(f'{rendition_name(product.image_hash, 100, "webp")} 100w', html)
+        self.assertIn('sizes="50px"', html)
+        self.assertIn('class="rounded"', html)
+
+        old_hash = product.image_hash
+        product.image_url = self._upload(size=(400, 300))
+        product.save()
+        self.assertNotEqual(product.image_hash, old_hash)
+        self.assertEqual(Product.objects.get(pk=product.pk).image_width, 400)
+
+    def test_generate_thumbnails_backfills(self):
+        product = Product.objects.create(
+            name='Drill', price=5, stock_quantity=1, category=self.category, image_url=self._upload(),
+        )
+        Product.objects.create(name='Saw', price=5, stock_quantity=1, category=self.category)
+        Product.objects.update(image_hash='', image_width=None, image_height=None)
+
+        for workers in ('1', '2'):
+            out = io.StringIO()
+            call_command('generate_thumbnails', '--workers', workers, '--force', stdout=out)
+            self.assertIn('Rendered images of 1 products', out.getvalue())
+            product.refresh_from_db()
+            self.assertEqual((product.image_width, product.image_height), (1200, 600))
@@ -1,15 +1,44 @@
+import csv
+import io
 from decimal import Decimal
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
+from django.db import transaction
 from django.db.models import DecimalField, F, Sum
+from .counters import StockChanged, move_stock
+from .importer import InvalidImportFile, import_products
 from .models import Product, Category
+from ecommerce.pagination import paginate
+from ecommerce.routers import use_replica
+from search.backends import filter_ranked, get_result_limit, numeric_id, ranked_search
 
 @staff_member_required
+@use_replica
 def product_list(request):
-    products = Product.objects.all()
-    return render(request, 'products/product_list.html', {'products': products})
+    products = Product.objects.select_related('category')
+    ordering = ('-created_at', '-product_id')
+
+    search_query = request.GET.get('search')
+    search_truncated = False
+    if search_query:
+        product_id = numeric_id(search_query)
+        if product_id is not None:
+            products = products.filter(product_id=product_id)
+        else:
+            ids, search_truncated = ranked_search('product', search_query)
+            products, ordering = filter_ranked(products, ids)
+
+    page = paginate(request, products, ordering)
+    context = {
+        'products': page,
+        'page': page,
+        'search_query': search_query,
+        'search_truncated': search_truncated,
+        'search_limit': get_result_limit(),
+    }
+    return render(request, 'products/product_list.html', context)
 
 @staff_member_required
 def product_detail(request, product_id):
@@ -47,8 +76,9 @@ def product_detail(request, product_id):
 
 # Category CRUD Views
 @staff_member_required
+@use_replica
 def category_list(request):
-    categories = Category.objects.all().order_by('name')
+    categories = Category.objects.order_by('name')
     return render(request, 'products/category_list.html', {'categories': categories})
 
 @staff_member_required
@@ -138,6 +168,37 @@ def product_create(request):
     categories = Category.objects.all().order_by('name')
     return render(request, 'products/product_form.html', {'categories': categories, 'action': 'Create'})
 
+# Rows of the per-row error report shown on the page; the rest are counted.
+IMPORT_ERRORS_SHOWN = 500
+
+
+@staff_member_required
+def product_import(request):
+    """Upsert products by SKU from an uploaded CSV file"""
+    result = None
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if upload is None:
+            messages.error(request, 'Choose a CSV file to import.')
+        else:
+            try:
+                result = import_products(
+                    io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''),
+                    create_categories=bool(request.POST.get('create_categories')),
+                    dry_run=bool(request.POST.get('dry_run')),
+                )
+            except (InvalidImportFile, UnicodeDecodeError, csv.Error) as e:
+                messages.error(request, f'Could not import file: {e}')
+            else:
+                messages.success(request, result.summary())
+
+    context = {
+        'result': result,
+        'errors': result.errors[:IMPORT_ERRORS_SHOWN] if result else [],
+        'hidden_errors': max(len(result.errors) - IMPORT_ERRORS_SHOWN, 0) if result else 0,
+    }
+    return render(request, 'products/product_import.html', context)
+
 @staff_member_required
 def product_edit(request, product_id):
     product = get_object_or_404(Product, product_id=product_id)
@@ -148,21 +209,33 @@ def product_edit(request, product_id):
         price = request.POST.get('price')
         category_id = request.POST.get('category')
         stock_quantity = request.POST.get('stock_quantity')
+        stock_loaded = request.POST.get('stock_loaded')
         image = request.FILES.get('image_url')
 
         if name and price and category_id and stock_quantity:
             try:
                 category = get_object_or_404(Category, category_id=category_id)
-                product.name = name
-                product.description = description
-                product.price = price
-                product.category = category
-                product.stock_quantity = stock_quantity
-                if image:
-                    product.image_url = image
-                product.save()
+                with transaction.atomic():
+                    # Orders reserve stock with relative updates while the
+                    # form is open, so the stock is not written back as
+                    # loaded: the edit applies the difference to the stock
+                    # the form showed instead.
+                    product = Product.objects.select_for_update().get(pk=product.pk)
+                    delta = int(stock_quantity) - int(stock_loaded or product.stock_quantity)
+                    product.name = name
+                    product.description = description
+                    product.price = price
+                    product.category = category
+                    fields = ['name', 'description', 'price', 'category']
+                    if image:
+                        product.image_url = image
+                        fields.append('image_url')
+                    product.save(update_fields=fields)
+                    move_stock(product, delta)
                 messages.success(request, f'Product "{name}" updated successfully!')
                 return redirect('product_list')
+            except StockChanged:
+                messages.error(request, 'Stock changed while editing; there are not enough units to remove.')
             except Exception as e:
                 messages.error(request, f'Error updating product: {str(e)}')
         else:
@@ -0,0 +1,205 @@
+"""
+Pluggable full-text search over :class:`~search.models.SearchDocument`.
+
+``search(kind, query)`` returns the ids of the best matching objects, best
+match first, for the ranked list pages. It stops at ``SEARCH_RESULT_LIMIT``
+ids; ``ranked_search`` also says whether that limit was hit. Filters use
+``matching(kind, query)`` instead: a subquery of every matching id, for
+``pk__in=`` lookups, so a common name never silently drops rows. The backend
+is picked from the ``SEARCH_BACKEND`` setting (a dotted path) or, by
+default, from the database vendor:
+
+* SQLite: an FTS5 table mirroring ``search_searchdocument``, ranked by bm25.
+* Postgres: ``tsvector`` matching plus ``pg_trgm`` similarity for typos,
+  both backed by GIN expression indexes.
+* Anything else: a plain ``icontains`` scan of the document table.
+
+The SQL here must match the indexes created in
+``search/migrations/0002_search_indexes.py``.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import SearchDocument
+
+
+DEFAULT_RESULT_LIMIT = 500
+
+FTS_TABLE = 'search_searchdocument_fts'
+
+# Must match the expressions indexed on Postgres.
+PG_VECTOR = (
+    "(setweight(to_tsvector('simple', title), 'A') || "
+    "setweight(to_tsvector('simple', body), 'B'))"
+)
+PG_TEXT = "(title || ' ' || body)"
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    """Split user input into the word tokens the indexes understand."""
+    return _TOKEN_RE.findall(query.lower())
+
+
+def numeric_id(query):
+    """Return ``query`` as an int if it is an exact numeric id, else ``None``."""
+    query = (query or '').strip().lstrip('#')
+    return int(query) if query.isdigit() else None
+
+
+class BaseSearchBackend:
+    def search(self, kind, query, limit):
+        raise NotImplementedError
+
+    def matching(self, kind, query):
+        raise NotImplementedError
+
+    def no_matches(self):
+        return SearchDocument.objects.none().values('object_id')
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Portable fallback: every token must appear somewhere in the document."""
+
+    def documents(self, kind, tokens):
+        documents = SearchDocument.objects.filter(kind=kind)
+        for token in tokens:
+            documents = documents.filter(Q(title__icontains=token) | Q(body__icontains=token))
+        return documents
+
+    def search(self, kind, query, limit):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        documents = self.documents(kind, tokens)
+        return list(documents.order_by('title').values_list('object_id', flat=True)[:limit])
+
+    def matching(self, kind, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return self.no_matches()
+        return self.documents(kind, tokens).values('object_id')
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    """FTS5 with prefix matching on every token; title hits weigh 10x body hits."""
+
+    def match_expression(self, tokens):
+        # Quote each token so FTS5 query syntax in user input is inert, and
+        # make it a prefix query so results appear while the user types.
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def search(self, kind, query, limit):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        sql = (
+            f'SELECT d.object_id FROM {FTS_TABLE} '
+            f'JOIN search_searchdocument d ON d.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND d.kind = %s '
+            f'ORDER BY bm25({FTS_TABLE}, 10.0, 1.0) LIMIT %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [self.match_expression(tokens), kind, limit])
+            return [row[0] for row in cursor.fetchall()]
+
+    def matching(self, kind, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return self.no_matches()
+        sql = (
+            f'SELECT d.object_id FROM {FTS_TABLE} '
+            f'JOIN search_searchdocument d ON d.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND d.kind = %s'
+        )
+        return RawSQL(sql, [self.match_expression(tokens), kind])
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Prefix tsquery matching OR trigram similarity, ranked by both."""
+
+    def search(self, kind, query, limit):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        text = ' '.join(tokens)
+        sql = (
+            f"SELECT object_id FROM search_searchdocument "
+            f"WHERE kind = %s AND ({PG_VECTOR} @@ to_tsquery('simple', %s) OR {PG_TEXT} %% %s) "
+            f"ORDER BY ts_rank({PG_VECTOR}, to_tsquery('simple', %s)) + similarity({PG_TEXT}, %s) DESC "
+            f"LIMIT %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [kind, tsquery, text, tsquery, text, limit])
+            return [row[0] for row in cursor.fetchall()]
+
+    def matching(self, kind, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return self.no_matches()
+        sql = (
+            f"SELECT object_id FROM search_searchdocument "
+            f"WHERE kind = %s AND ({PG_VECTOR} @@ to_tsquery('simple', %s) OR {PG_TEXT} %% %s)"
+        )
+        return RawSQL(sql, [kind, ' & '.join(f'{token}:*' for token in tokens), ' '.join(tokens)])
+
+
+_VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTSSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend():
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return _VENDOR_BACKENDS.get(connection.vendor, SimpleSearchBackend)()
+
+
+def get_result_limit():
+    return getattr(settings, 'SEARCH_RESULT_LIMIT', DEFAULT_RESULT_LIMIT)
+
+
+def search(kind, query, limit=None):
+    """Return the ids of the best ``limit`` ``kind`` objects matching ``query``, best first."""
+    return get_backend().search(kind, query, limit or get_result_limit())
+
+
+def ranked_search(kind, query):
+    """
+    ``(ids, truncated)``: the ids of the best ``SEARCH_RESULT_LIMIT`` matches,
+    best first, and whether more objects matched than that.
+    """
+    limit = get_result_limit()
+    ids = search(kind, query, limit + 1)
+    return ids[:limit], len(ids) > limit
+
+
+def matching(kind, query):
+    """
+    Every id of ``kind`` objects matching ``query``, as a subquery for
+    ``pk__in=`` filters. Unranked and not limited.
+    """
+    return get_backend().matching(kind, query)
+
+
+def filter_ranked(queryset, ids):
+    """
+    Restrict ``queryset`` to ``ids`` and annotate each row's position in that
+    list as ``search_rank``. Returns the queryset and the keyset ordering to
+    paginate it by (best match first).
+    """
+    whens = [When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)]
+    queryset = queryset.filter(pk__in=ids).annotate(
+        search_rank=Case(*whens, default=Value(len(ids)), output_field=IntegerField())
+    )
+    return queryset, ('search_rank', 'pk')
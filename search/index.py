@@ -0,0 +1,91 @@
+"""
+What gets indexed for search and how the index is kept up to date.
+
+Each entry in ``SOURCES`` maps a document kind to its model and to a function
+returning the ``(title, body)`` text for an instance. Title text ranks above
+body text.
+"""
+
+from django.db import transaction
+
+from accounts.models import Customer
+from products.models import Product
+
+from .models import SearchDocument
+
+
+def _customer_text(customer):
+    title = ' '.join(filter(None, [
+        customer.username, customer.first_name, customer.last_name, customer.email,
+    ]))
+    return title, customer.phone_number or ''
+
+
+def _product_text(product):
+    return ' '.join(filter(None, [product.name, product.sku])), product.description or ''
+
+
+SOURCES = {
+    'customer': (Customer, _customer_text),
+    'product': (Product, _product_text),
+}
+
+KIND_BY_MODEL = {model: kind for kind, (model, _) in SOURCES.items()}
+
+
+def index_instance(instance):
+    kind = KIND_BY_MODEL[type(instance)]
+    title, body = SOURCES[kind][1](instance)
+    SearchDocument.objects.update_or_create(
+        kind=kind,
+        object_id=instance.pk,
+        defaults={'title': title, 'body': body},
+    )
+
+
+def remove_instance(instance):
+    kind = KIND_BY_MODEL[type(instance)]
+    SearchDocument.objects.filter(kind=kind, object_id=instance.pk).delete()
+
+
+def index_objects(kind, queryset):
+    """
+    Write the documents of the ``kind`` objects in ``queryset`` with one
+    upsert, e.g. for the rows a bulk write just touched. Returns their number.
+    """
+    text = SOURCES[kind][1]
+    documents = []
+    for instance in queryset.order_by():
+        title, body = text(instance)
+        documents.append(SearchDocument(kind=kind, object_id=instance.pk, title=title, body=body))
+    SearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['kind', 'object_id'],
+        update_fields=['title', 'body'],
+    )
+    return len(documents)
+
+
+def rebuild(kinds=None, batch_size=2000):
+    """
+    Regenerate the documents for ``kinds`` (default: all) from their models.
+    Needed after bulk inserts, which skip the model signals. Returns the
+    number of documents written.
+    """
+    total = 0
+    for kind in kinds or SOURCES:
+        model, text = SOURCES[kind]
+        with transaction.atomic():
+            SearchDocument.objects.filter(kind=kind).delete()
+            batch = []
+            for instance in model.objects.order_by().iterator(chunk_size=batch_size):
+                title, body = text(instance)
+                batch.append(SearchDocument(kind=kind, object_id=instance.pk, title=title, body=body))
+                if len(batch) >= batch_size:
+                    SearchDocument.objects.bulk_create(batch)
+                    total += len(batch)
+                    batch = []
+            SearchDocument.objects.bulk_create(batch)
+            total += len(batch)
+    return total
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from search.index import SOURCES, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search documents for customers and products'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'kinds',
+            nargs='*',
+            choices=sorted(SOURCES),
+            help='Document kinds to rebuild (default: all).',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild(options['kinds'] or None, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} documents in {elapsed:.2f}s'))
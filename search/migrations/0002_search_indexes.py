@@ -0,0 +1,102 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE search_searchdocument_fts USING fts5(
+        title, body,
+        content='search_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER search_searchdocument_ai AFTER INSERT ON search_searchdocument BEGIN
+        INSERT INTO search_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER search_searchdocument_ad AFTER DELETE ON search_searchdocument BEGIN
+        INSERT INTO search_searchdocument_fts(search_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER search_searchdocument_au AFTER UPDATE ON search_searchdocument BEGIN
+        INSERT INTO search_searchdocument_fts(search_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO search_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS search_searchdocument_au',
+    'DROP TRIGGER IF EXISTS search_searchdocument_ad',
+    'DROP TRIGGER IF EXISTS search_searchdocument_ai',
+    'DROP TABLE IF EXISTS search_searchdocument_fts',
+]
+
+POSTGRES_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """
+    CREATE INDEX search_searchdocument_tsv ON search_searchdocument USING GIN (
+        (setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B'))
+    )
+    """,
+    """
+    CREATE INDEX search_searchdocument_trgm ON search_searchdocument
+        USING GIN ((title || ' ' || body) gin_trgm_ops)
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS search_searchdocument_trgm',
+    'DROP INDEX IF EXISTS search_searchdocument_tsv',
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+def index_existing_rows(apps, schema_editor):
+    # Mirrors search.index; historical models cannot use that module.
+    Customer = apps.get_model('accounts', 'Customer')
+    Product = apps.get_model('products', 'Product')
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    documents = [
+        SearchDocument(
+            kind='customer',
+            object_id=customer.pk,
+            title=' '.join(filter(None, [
+                customer.username, customer.first_name, customer.last_name, customer.email,
+            ])),
+            body=customer.phone_number or '',
+        )
+        for customer in Customer.objects.iterator()
+    ]
+    documents += [
+        SearchDocument(kind='product', object_id=product.pk, title=product.name, body=product.description or '')
+        for product in Product.objects.iterator()
+    ]
+    SearchDocument.objects.bulk_create(documents, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('accounts', '0002_customer'),
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+        migrations.RunPython(index_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """
+    One searchable row per indexed object (see ``search/index.py``).
+
+    This table is the source of truth for the search index; the database
+    specific structures (an FTS5 table on SQLite, tsvector and trigram
+    indexes on Postgres) are built on top of it by the migrations.
+    """
+    kind = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    title = models.TextField()
+    body = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='searchdocument_unique_object'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}: {self.title[:50]}"
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import Customer
+from products.models import Product
+
+from .index import index_instance, remove_instance
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=Product)
+def update_search_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_instance(instance)
+
+
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=Product)
+def delete_search_document(sender, instance, **kwargs):
+    remove_instance(instance)
@@ -0,0 +1,144 @@
+import base64
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import Customer, User
+from orders.models import Order, OrderItem
+from payments.models import Payment
+from products.models import Category, Product
+
+from .backends import matching, numeric_id, ranked_search, search
+from .index import rebuild
+from .models import SearchDocument
+
+
+class SearchIndexTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ada = Customer.objects.create(
+            username='ada', email='ada.lovelace@example.com', first_name='Ada',
+            last_name='Lovelace', phone_number='555-0199', password='x',
+        )
+        cls.alan = Customer.objects.create(
+            username='alan', email='turing@example.org', first_name='Alan',
+            last_name='Turing', phone_number='555-0142', password='x',
+        )
+        category = Category.objects.create(name='Kitchen')
+        cls.kettle = Product.objects.create(
+            name='Electric Kettle', description='Boils water fast', price=30,
+            stock_quantity=5, category=category,
+        )
+        cls.mug = Product.objects.create(
+            name='Travel Mug', description='Keeps your kettle-boiled tea warm', price=12,
+            stock_quantity=5, category=category,
+        )
+
+    def test_signals_keep_documents_in_sync(self):
+        self.assertEqual(search('customer', 'lovelace'), [self.ada.pk])
+        self.ada.last_name = 'Byron'
+        self.ada.email = 'ada.byron@example.com'
+        self.ada.save()
+        self.assertEqual(search('customer', 'lovelace'), [])
+        self.assertEqual(search('customer', 'byron'), [self.ada.pk])
+        self.ada.delete()
+        self.assertEqual(search('customer', 'byron'), [])
+
+    def test_prefix_email_and_phone_matching(self):
+        self.assertEqual(search('customer', 'tur'), [self.alan.pk])
+        self.assertEqual(search('customer', 'turing@example'), [self.alan.pk])
+        self.assertEqual(search('customer', '555-0199'), [self.ada.pk])
+
+    def test_title_matches_rank_above_body_matches(self):
+        self.assertEqual(search('product', 'kettle'), [self.kettle.pk, self.mug.pk])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(search('product', 'kettle" OR "mug'), [])
+        self.assertEqual(search('product', '***'), [])
+
+    @override_settings(SEARCH_BACKEND='search.backends.SimpleSearchBackend')
+    def test_simple_backend(self):
+        self.assertEqual(search('customer', 'ada example'), [self.ada.pk])
+
+    @override_settings(SEARCH_RESULT_LIMIT=1)
+    def test_filters_are_not_limited(self):
+        self.assertEqual(ranked_search('product', 'kettle'), ([self.kettle.pk], True))
+        self.assertEqual(ranked_search('product', 'travel'), ([self.mug.pk], False))
+        for backend in ('search.backends.SQLiteFTSSearchBackend', 'search.backends.SimpleSearchBackend'):
+            with self.settings(SEARCH_BACKEND=backend):
+                products = Product.objects.filter(pk__in=matching('product', 'kettle'))
+                self.assertEqual(set(products), {self.kettle, self.mug})
+                self.assertFalse(Product.objects.filter(pk__in=matching('product', '***')).exists())
+
+    def test_rebuild(self):
+        SearchDocument.objects.all().delete()
+        self.assertEqual(rebuild(), 4)
+        self.assertEqual(search('product', 'travel'), [self.mug.pk])
+
+    def test_numeric_id(self):
+        self.assertEqual(numeric_id(' #42 '), 42)
+        self.assertIsNone(numeric_id('42a'))
+
+
+class SearchViewsTest(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username='staff', password='x', is_staff=True))
+        self.ada = Customer.objects.create(username='ada', email='ada@example.com', password='x')
+        self.bob = Customer.objects.create(username='bob', email='bob@example.com', password='x')
+        self.ada_order = Order.objects.create(customer=self.ada, total_amount=10)
+        self.bob_order = Order.objects.create(customer=self.bob, total_amount=10)
+        self.payment = Payment.objects.create(
+            order=self.bob_order, payment_method='paypal', amount=10, transaction_id='t1'
+        )
+
+    def test_order_search_by_customer_and_exact_id(self):
+        response = self.client.get(reverse('admin_orders'), {'search': 'ada'})
+        self.assertEqual([o.order_id for o in response.context['page']], [self.ada_order.order_id])
+
+        response = self.client.get(reverse('admin_orders'), {'search': str(self.bob_order.order_id)})
+        self.assertEqual([o.order_id for o in response.context['page']], [self.bob_order.order_id])
+
+    def test_order_search_by_product_name(self):
+        category = Category.objects.create(name='Kitchen')
+        kettle = Product.objects.create(name='Kettle', price=30, stock_quantity=5, category=category)
+        OrderItem.objects.create(order=self.bob_order, product=kettle, quantity=1, price=30)
+        response = self.client.get(reverse('admin_orders'), {'search': 'kettle'})
+        self.assertEqual([o.order_id for o in response.context['page']], [self.bob_order.order_id])
+
+    @override_settings(SEARCH_RESULT_LIMIT=1)
+    def test_search_limit_only_applies_to_ranked_lists(self):
+        ada_2 = Customer.objects.create(username='ada_2', email='ada2@example.com', password='x')
+        Order.objects.create(customer=ada_2, total_amount=10)
+        response = self.client.get(reverse('admin_orders'), {'search': 'ada'})
+        self.assertEqual(len(response.context['page']), 2)
+        export = self.client.get(reverse('customer_export'), {'search': 'ada'})
+        self.assertEqual(len(b''.join(export.streaming_content).splitlines()), 3)
+
+        response = self.client.get(reverse('customer_list'), {'search': 'ada'})
+        self.assertEqual(len(response.context['page']), 1)
+        self.assertContains(response, 'only the 1 best matches are listed')
+
+    def test_payment_search_by_order_id(self):
+        response = self.client.get(reverse('admin_payments'), {'search': str(self.bob_order.order_id)})
+        self.assertEqual([p.payment_id for p in response.context['page']], [self.payment.payment_id])
+
+    def test_customer_search_paginates_in_rank_order(self):
+        for index in range(5):
+            Customer.objects.create(username=f'ada{index}', email=f'x{index}@example.com', password='x')
+        expected = search('customer', 'ada')
+        url = reverse('customer_list')
+        first = self.client.get(url, {'search': 'ada', 'page_size': 4})
+        second = self.client.get(url + first.context['page'].next_url)
+        seen = [c.pk for c in first.context['page']] + [c.pk for c in second.context['page']]
+        self.assertEqual(seen, expected)
+
+    def test_tampered_cursor_on_ranked_list_falls_back_to_first_page(self):
+        for name, position in (('product_list', [{}, 1]), ('customer_list', [True, 1]), ('customer_list', ['1', 1])):
+            cursor = base64.urlsafe_b64encode(json.dumps({'d': 'n', 'p': position}).encode()).decode().rstrip('=')
+            with self.subTest(name=name, position=position):
+                response = self.client.get(reverse(name), {'search': 'ada', 'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.context['page'].has_previous)
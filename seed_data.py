@@ -429,7 +429,7 @@ def create_orders(customers, products):
                 )
 
             orders.append(order)
-            print(f"  Created order #{order.order_id} for {customer.username} - ${order.total_amount} ({order.items.count()} items)")
+            print(f"  Created order #{order.order_id} for {customer.username} - ${order.total_amount} ({len(order_items_data)} items)")
 
     print(f"Created {len(orders)} orders.\n")
     return orders
@@ -492,7 +492,7 @@ def print_summary(users, customers, categories, products, orders, payments):
     print(f"  - Categories: {len(categories)}")
     print(f"  - Products: {len(products)}")
     print(f"  - Orders: {len(orders)}")
-    print(f"  - Order Items: {sum(order.items.count() for order in orders)}")
+    print(f"  - Order Items: {OrderItem.objects.filter(order__in=orders).count()}")
     print(f"  - Payments: {len(payments)}")
     print(f"\nTest Credentials:")
     print(f"  Users: username/password123 (e.g., john_doe/password123)")